@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Hook event log writer
+
+Single writer API for pre-commit hook events. Each event is appended to
+~/.claude-metrics/blocks.log (override with CLAUDE_METRICS_HOOK_LOG) as one
+JSON object per line:
+
+    {"v": 2, "ts": "2025-01-31T14:02:11", "code": "SECRET_BLOCKED",
+     "repo": "student-portal", "user": "dev@example.com", "file": "src/config.ts"}
+
+reference/scripts/collect_metrics.py reads this log (and older
+timestamp,user,event_type lines) and maintains a sidecar index next to it,
+so hooks only ever append.
+"""
+
+import getpass
+import json
+import os
+import subprocess
+from datetime import datetime
+from typing import Optional
+
+LOG_VERSION = 2
+
+# Keep in sync with default_hook_log_path() in collect_metrics.py.
+DEFAULT_LOG_PATH = os.environ.get("CLAUDE_METRICS_HOOK_LOG") or os.path.expanduser("~/.claude-metrics/blocks.log")
+
+# Fixed event codes. Keep in sync with HOOK_EVENT_COUNTERS in collect_metrics.py.
+SECRET_BLOCKED = "SECRET_BLOCKED"
+PII_WARNING = "PII_WARNING"            # PII pattern found, commit was blocked anyway
+PII_EXPOSED = "PII_EXPOSED"            # PII pattern found and the commit went through
+ANTIPATTERN_WARNING = "ANTIPATTERN_WARNING"
+DANGEROUS_FILE_BLOCKED = "DANGEROUS_FILE_BLOCKED"
+
+EVENT_CODES = (SECRET_BLOCKED, PII_WARNING, PII_EXPOSED, ANTIPATTERN_WARNING, DANGEROUS_FILE_BLOCKED)
+
+
+def _git(*args: str) -> str:
+    try:
+        result = subprocess.run(["git", *args], capture_output=True, text=True)
+    except OSError:
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+class HookLogWriter:
+    """Appends structured events to the hook log"""
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH, repo: Optional[str] = None, user: Optional[str] = None):
+        self.path = path
+        self.repo = repo or os.path.basename(_git("rev-parse", "--show-toplevel")) or os.path.basename(os.getcwd())
+        self.user = user or _git("config", "user.email") or getpass.getuser()
+        self._pending: list[dict] = []
+
+    def add(self, code: str, file: Optional[str] = None) -> None:
+        """Queue an event; call flush() to write queued events"""
+        if code not in EVENT_CODES:
+            raise ValueError(f"Unknown hook event code: {code}")
+        self._pending.append({
+            "v": LOG_VERSION,
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "code": code,
+            "repo": self.repo,
+            "user": self.user,
+            "file": file,
+        })
+
+    def flush(self) -> None:
+        """Append queued events in one write (best effort, never fails the hook)"""
+        if not self._pending:
+            return
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in self._pending)
+        self._pending = []
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+        except OSError:
+            pass
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Incremental Anomaly Detection for Metric Snapshots
+
+Keeps an exponentially weighted mean and variance (EWMA) per metric, so each
+new snapshot is scored and folded in with O(1) work per metric. Nothing ever
+re-reads older snapshots. The state is a small JSON file kept next to the
+snapshots (anomaly_state.json).
+
+A value is flagged when it lies more than `threshold` standard deviations
+from the mean expected before it arrived, once the metric has at least
+`warmup` observations. Scores are stored in the snapshot itself ("anomalies"),
+so reports can read them without the state file.
+"""
+
+import json
+import math
+import os
+from typing import Optional
+
+STATE_FILE = "anomaly_state.json"
+STATE_VERSION = 1
+
+DEFAULT_ALPHA = 0.2        # Weight of the newest snapshot (~9-snapshot memory)
+DEFAULT_THRESHOLD = 3.0    # |z| needed to call a change significant
+DEFAULT_WARMUP = 5         # Observations before a metric can be flagged
+
+# Floor on the standard deviation, relative to the mean, so a metric that
+# has been perfectly flat does not flag the first tiny wobble
+MIN_RELATIVE_STD = 0.05
+MAX_Z = 99.0
+
+CATEGORIES = ("productivity", "quality", "knowledge", "compliance", "adoption")
+
+# Metrics where a decrease is an improvement
+LOWER_IS_BETTER = {
+    "pr_cycle_time_hours",
+    "avg_review_iterations",
+    "bug_count",
+    "bug_reopen_rate",
+    "pii_exposure_events",
+    "stale_documents",
+}
+
+
+def iter_metric_values(snapshot: dict):
+    """Yield ("category.name", value) for every complete numeric metric in a snapshot.
+
+    Fields the collector marked partial or missing (see field_status) are
+    skipped, so a cut-short run neither raises alerts nor skews the state.
+    """
+    field_status = snapshot.get("field_status") or {}
+    for category in CATEGORIES:
+        for name, value in (snapshot.get(category) or {}).items():
+            metric = f"{category}.{name}"
+            if field_status.get(metric, {}).get("status", "complete") != "complete":
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield metric, float(value)
+
+
+def default_state_path(save_path: str) -> str:
+    """State file next to a saved snapshot, or inside a snapshot directory"""
+    if os.path.isdir(save_path):
+        return os.path.join(save_path, STATE_FILE)
+    return os.path.join(os.path.dirname(os.path.abspath(save_path)), STATE_FILE)
+
+
+class AnomalyDetector:
+    """Per-metric EWMA mean/variance with z-score flagging"""
+
+    def __init__(
+        self,
+        state: Optional[dict] = None,
+        alpha: float = DEFAULT_ALPHA,
+        threshold: float = DEFAULT_THRESHOLD,
+        warmup: int = DEFAULT_WARMUP,
+    ):
+        if not state or state.get("version") != STATE_VERSION:
+            state = {"version": STATE_VERSION, "last_period_end": None, "metrics": {}}
+        self.state = state
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "AnomalyDetector":
+        try:
+            with open(path) as f:
+                return cls(json.load(f), **kwargs)
+        except (OSError, ValueError):
+            return cls(**kwargs)
+
+    def save(self, path: str) -> None:
+        """Atomically write the state file"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def score(self, metric: str, value: float) -> dict:
+        """Assess a value against the current state without updating it"""
+        entry = self.state["metrics"].get(metric)
+        if entry is None:
+            return {"value": value, "expected": None, "z": None, "significant": False}
+
+        std = max(math.sqrt(entry["var"]), abs(entry["mean"]) * MIN_RELATIVE_STD)
+        if std:
+            z = (value - entry["mean"]) / std
+        else:
+            # Any move off a metric that has been exactly zero stands out
+            z = math.copysign(MAX_Z, value - entry["mean"]) if value != entry["mean"] else 0.0
+        z = max(-MAX_Z, min(MAX_Z, z))
+        name = metric.split(".", 1)[1]
+        return {
+            "value": value,
+            "expected": round(entry["mean"], 3),
+            "z": round(z, 2),
+            "significant": entry["n"] >= self.warmup and abs(z) >= self.threshold,
+            "direction": "up" if z > 0 else "down",
+            "is_improvement": (z < 0) if name in LOWER_IS_BETTER else (z > 0),
+        }
+
+    def _update(self, metric: str, value: float) -> None:
+        entry = self.state["metrics"].get(metric)
+        if entry is None:
+            self.state["metrics"][metric] = {"mean": value, "var": 0.0, "n": 1}
+            return
+        diff = value - entry["mean"]
+        increment = self.alpha * diff
+        entry["mean"] += increment
+        entry["var"] = (1 - self.alpha) * (entry["var"] + diff * increment)
+        entry["n"] += 1
+
+    def observe(self, snapshot: dict) -> dict[str, dict]:
+        """Score every metric in a snapshot, then fold the snapshot into the state.
+
+        Snapshots are ordered by period end. One ending at or before the
+        last one seen is scored but not folded in again, so re-running a
+        collection is harmless. Baseline snapshots are one-off pre-adoption
+        measurements, not part of the trend: they are scored only.
+        """
+        assessments = {metric: self.score(metric, value) for metric, value in iter_metric_values(snapshot)}
+
+        period_end = snapshot.get("period_end")
+        last = self.state.get("last_period_end")
+        if period_end and not snapshot.get("is_baseline") and (last is None or period_end > last):
+            for metric, value in iter_metric_values(snapshot):
+                self._update(metric, value)
+            self.state["last_period_end"] = period_end
+
+        return assessments
@@ -14,20 +14,36 @@ Usage:
     python collect_metrics.py --baseline         # Collect baseline (pre-Claude)
     python collect_metrics.py --months=3         # Specify time range
     python collect_metrics.py --output=json      # Output format (json, csv, markdown)
+    python collect_metrics.py --distinct-mode=hll --hll-error=0.02  # Sketch-based dev counts
+    python collect_metrics.py --shard=0/4 --save=part0.json          # One shard's partial result
+    python collect_metrics.py merge part*.json --output=markdown     # Combine shard partials
+    python collect_metrics.py --events=events.ndjson.gz              # Also export raw events
+    python collect_metrics.py --backfill=2024-01..2025-12 --save=history  # Monthly snapshots in one pass
+    python collect_metrics.py --deadline=120                         # Bounded run; marks incomplete fields
 """
 
 import argparse
+import gzip
+import hashlib
 import json
+import math
 import os
 import re
 import subprocess
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Optional
-from dataclasses import dataclass, asdict
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, Optional, TextIO
+from dataclasses import dataclass, asdict, field
 import urllib.request
 import urllib.error
 
+from anomalies import STATE_FILE, AnomalyDetector, default_state_path
+from coverage_reports import COVERAGE_PATTERNS, find_coverage_reports, parse_coverage_file
+from issue_exports import IssueIndex
+from knowledge_index import KNOWLEDGE_DIRS, SKIPPED_FILES, KnowledgeIndex, default_index_path
+from sketches import DistinctCounter, distinct_counter_from_dict, make_distinct_counter, union_count
+
 
 @dataclass
 class ProductivityMetrics:
@@ -38,6 +54,13 @@ class ProductivityMetrics:
     commits_per_dev_per_week: float
     active_developers: int
     total_developers: int
+    # Per active developer distributions (None when there is no activity)
+    commits_per_dev_per_week_p50: Optional[float] = None
+    commits_per_dev_per_week_p90: Optional[float] = None
+    commits_per_dev_per_week_p99: Optional[float] = None
+    prs_per_dev_per_week_p50: Optional[float] = None
+    prs_per_dev_per_week_p90: Optional[float] = None
+    prs_per_dev_per_week_p99: Optional[float] = None
 
 
 @dataclass
@@ -58,6 +81,17 @@ class KnowledgeMetrics:
     failures_documented: int
     pattern_references: int
     avg_reuse_per_pattern: float
+    # Changes to .claude/ within the period, from git history
+    learnings_added: int = 0
+    learnings_per_month: float = 0.0
+    patterns_added: int = 0
+    patterns_promoted: int = 0
+    failures_added: int = 0
+    knowledge_removed: int = 0
+    # /search-knowledge index (knowledge_index.py)
+    indexed_documents: int = 0
+    indexed_terms: int = 0
+    stale_documents: int = 0
 
 
 @dataclass
@@ -90,6 +124,882 @@ class AllMetrics:
     knowledge: KnowledgeMetrics
     compliance: ComplianceMetrics
     adoption: AdoptionMetrics
+    field_status: dict[str, dict] = field(default_factory=dict)
+    # One ProjectRow dict per repo, sorted by name
+    projects: list[dict] = field(default_factory=list)
+    # "category.metric" -> EWMA score (see anomalies.py), when state is kept
+    anomalies: dict[str, dict] = field(default_factory=dict)
+
+
+@dataclass
+class ProjectRow:
+    """Per-repo adoption row for the dashboard's project table"""
+    name: str
+    team_size: int
+    has_claude: bool
+    starter_kit: bool
+    patterns: int
+    learnings: int
+    status: str  # active, onboarding or not_started
+
+
+# =============================================================================
+# Deadline Budget and Field Status
+# =============================================================================
+
+COMPLETE = "complete"
+PARTIAL = "partial"
+MISSING = "missing"
+
+# Which output fields each data source feeds
+SOURCE_FIELDS = {
+    "commits": (
+        "productivity.commits_per_dev_per_week", "productivity.commits_per_dev_per_week_p50",
+        "productivity.commits_per_dev_per_week_p90", "productivity.commits_per_dev_per_week_p99",
+    ),
+    "developers": (
+        "productivity.active_developers", "productivity.total_developers",
+        "productivity.prs_per_dev_per_week", "productivity.commits_per_dev_per_week",
+    ),
+    "pull_requests": (
+        "productivity.pr_cycle_time_hours", "productivity.prs_per_dev_per_week",
+        "productivity.prs_per_dev_per_week_p50", "productivity.prs_per_dev_per_week_p90",
+        "productivity.prs_per_dev_per_week_p99",
+    ),
+    "reviews": ("productivity.avg_review_iterations",),
+    "issues": ("quality.bug_count", "quality.bug_reopen_rate"),
+    "coverage": ("quality.test_coverage_avg",),
+    "hook_log": (
+        "quality.security_blocks_caught", "quality.pii_patterns_detected",
+        "compliance.secrets_blocked", "compliance.pii_exposure_events",
+        "compliance.dangerous_files_blocked", "compliance.security_antipatterns_warned",
+    ),
+    "knowledge": ("knowledge.learnings_count", "knowledge.patterns_count", "knowledge.failures_documented"),
+    "pattern_references": ("knowledge.pattern_references", "knowledge.avg_reuse_per_pattern"),
+    "knowledge_history": (
+        "knowledge.learnings_added", "knowledge.learnings_per_month", "knowledge.patterns_added",
+        "knowledge.patterns_promoted", "knowledge.failures_added", "knowledge.knowledge_removed",
+    ),
+    "knowledge_index": ("knowledge.indexed_documents", "knowledge.indexed_terms", "knowledge.stale_documents"),
+    "adoption": (
+        "adoption.projects_with_claude", "adoption.total_projects",
+        "adoption.adoption_percentage", "adoption.starter_kit_usage",
+    ),
+}
+
+
+# Sources gathered once by shard 0 rather than split across shards
+SHARD_ZERO_SOURCES = ("issues", "hook_log")
+
+
+def combine_status(a: dict, b: dict) -> dict:
+    """Combine two status records for the same source or field"""
+    if a["status"] == b["status"]:
+        status = a["status"]
+    else:
+        # Complete somewhere and not elsewhere still means some data arrived
+        status = PARTIAL
+    reasons = a.get("reasons", []) + [r for r in b.get("reasons", []) if r not in a.get("reasons", [])]
+    return {"status": status, "reasons": reasons}
+
+
+class Deadline:
+    """Wall-clock budget shared by the collectors (None means unlimited)"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def share(self, weight: float, total_weight: float) -> "Deadline":
+        """A sub-budget holding `weight / total_weight` of what is left"""
+        remaining = self.remaining()
+        if remaining is None:
+            return Deadline()
+        return Deadline(remaining * weight / total_weight)
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """Per-call timeout: what is left, optionally capped"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return remaining if cap is None else min(cap, remaining)
+
+
+HOOK_COUNT_KEYS = ("secrets", "pii", "pii_exposed", "dangerous_files", "antipatterns")
+
+# v2: per-developer activity is carried as exact counts instead of sketches
+PARTIAL_FORMAT = "partial-v2"
+
+
+@dataclass
+class PartialMetrics:
+    """Mergeable raw counters behind AllMetrics.
+
+    Sharded runs emit these instead of final ratios. merge() sums counters
+    and unions developer sets/sketches; finalize() derives AllMetrics the
+    same way for a single-node run and for any number of merged shards.
+    """
+    collected_at: str
+    period_start: str
+    period_end: str
+    is_baseline: bool
+    months: int
+    # Set for weekly backfill periods; otherwise weeks are derived from months
+    period_weeks: Optional[int] = None
+    # Productivity
+    pr_cycle_seconds_total: int = 0
+    pr_cycle_count: int = 0
+    prs_merged: int = 0
+    commits: int = 0
+    review_iterations_total: int = 0
+    reviewed_prs: int = 0
+    active_developers: Optional[DistinctCounter] = None
+    total_developers: Optional[DistinctCounter] = None
+    total_developers_override: Optional[int] = None
+    # Commits per author email / merged PRs per author login for the period.
+    # Kept exact so a developer active in several shards is summed on merge,
+    # and the percentiles are computed exactly from the merged counts.
+    commit_activity: dict[str, int] = field(default_factory=dict)
+    pr_activity: dict[str, int] = field(default_factory=dict)
+    # Quality
+    bug_count: int = 0
+    bugs_reopened: int = 0
+    bugs_resolved: int = 0
+    coverage_lines_covered: int = 0
+    coverage_lines_total: int = 0
+    # Quality / Compliance (pre-commit hook log)
+    hook_counts: dict[str, int] = field(default_factory=lambda: dict.fromkeys(HOOK_COUNT_KEYS, 0))
+    # Knowledge
+    learnings: int = 0
+    patterns: int = 0
+    failures: int = 0
+    pattern_references: int = 0
+    learnings_added: int = 0
+    patterns_added: int = 0
+    patterns_promoted: int = 0
+    failures_added: int = 0
+    knowledge_removed: int = 0
+    indexed_documents: int = 0
+    indexed_terms: int = 0
+    stale_documents: int = 0
+    # Adoption
+    projects_with_claude: int = 0
+    total_projects: int = 0
+    starter_kit_usage: int = 0
+    projects: list[dict] = field(default_factory=list)
+    # Data source -> {"status": complete|partial|missing, "reasons": [...]}
+    source_status: dict[str, dict] = field(default_factory=dict)
+
+    SUMMED_FIELDS = (
+        "pr_cycle_seconds_total", "pr_cycle_count", "prs_merged", "commits",
+        "review_iterations_total", "reviewed_prs", "bug_count", "bugs_reopened",
+        "bugs_resolved", "coverage_lines_covered", "coverage_lines_total",
+        "learnings", "patterns", "failures", "pattern_references",
+        "learnings_added", "patterns_added", "patterns_promoted", "failures_added", "knowledge_removed",
+        "indexed_documents", "indexed_terms", "stale_documents",
+        "projects_with_claude", "total_projects", "starter_kit_usage",
+    )
+    COUNTER_FIELDS = ("active_developers", "total_developers")
+    ACTIVITY_FIELDS = ("commit_activity", "pr_activity")
+
+    def distinct_mode(self) -> Optional[str]:
+        """Kind (and HLL precision) of the developer counters, None when there are none"""
+        for name in self.COUNTER_FIELDS:
+            counter = getattr(self, name)
+            if counter is not None:
+                precision = getattr(counter, "precision", None)
+                return counter.kind if precision is None else f"{counter.kind} (precision {precision})"
+        return None
+
+    def merge(self, other: "PartialMetrics") -> None:
+        """Fold another shard's counters into this one"""
+        if (self.months, self.period_weeks, self.is_baseline) != (other.months, other.period_weeks, other.is_baseline):
+            raise ValueError("Cannot merge partial results with different --months, --bucket or --baseline")
+        mine, theirs = self.distinct_mode(), other.distinct_mode()
+        if mine and theirs and mine != theirs:
+            raise ValueError(
+                f"Cannot merge partial results with different --distinct-mode or --hll-error ({mine} vs {theirs})"
+            )
+
+        self.collected_at = max(self.collected_at, other.collected_at)
+        self.period_start = min(self.period_start, other.period_start)
+        self.period_end = max(self.period_end, other.period_end)
+
+        for name in self.SUMMED_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+        for name in self.COUNTER_FIELDS:
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if mine is None:
+                setattr(self, name, theirs.copy() if theirs is not None else None)
+            elif theirs is not None:
+                mine.merge(theirs)
+
+        for name in self.ACTIVITY_FIELDS:
+            mine = getattr(self, name)
+            for author, count in getattr(other, name).items():
+                mine[author] = mine.get(author, 0) + count
+
+        if other.total_developers_override is not None:
+            self.total_developers_override = max(self.total_developers_override or 0, other.total_developers_override)
+
+        for key, value in other.hook_counts.items():
+            self.hook_counts[key] = self.hook_counts.get(key, 0) + value
+
+        self.projects.extend(other.projects)
+
+        for source, status in other.source_status.items():
+            mine = self.source_status.get(source)
+            self.source_status[source] = combine_status(mine, status) if mine else status
+
+    def field_status(self) -> dict[str, dict]:
+        """Per-field completeness derived from the status of each data source"""
+        fields = {}
+        categories = (
+            ("productivity", ProductivityMetrics), ("quality", QualityMetrics), ("knowledge", KnowledgeMetrics),
+            ("compliance", ComplianceMetrics), ("adoption", AdoptionMetrics),
+        )
+        for category, metrics_class in categories:
+            for name in metrics_class.__dataclass_fields__:
+                fields[f"{category}.{name}"] = {"status": COMPLETE, "reasons": []}
+
+        for source, status in self.source_status.items():
+            if status["status"] == COMPLETE:
+                continue
+            for name in SOURCE_FIELDS.get(source, ()):
+                current = fields[name]
+                if current["status"] == COMPLETE:
+                    fields[name] = {"status": status["status"], "reasons": list(status["reasons"])}
+                else:
+                    merged = combine_status(current, status)
+                    # A field fed by a missing and a partial source is partial
+                    fields[name] = merged
+        return fields
+
+    def productivity(self) -> ProductivityMetrics:
+        active_devs = self.active_developers.count() if self.active_developers else 0
+        if self.total_developers_override is not None:
+            total_devs = self.total_developers_override
+        else:
+            total_devs = self.total_developers.count() if self.total_developers else 0
+        weeks = self.period_weeks or max(1, self.months * 4)
+        cycle_hours = self.pr_cycle_seconds_total / 3600
+        # Same population as the means: every active developer, with zeros for those without activity
+        commit_counts = activity_counts(self.commit_activity, active_devs)
+        pr_counts = activity_counts(self.pr_activity, active_devs)
+
+        return ProductivityMetrics(
+            pr_cycle_time_hours=round(cycle_hours / max(1, self.pr_cycle_count), 1),
+            prs_per_dev_per_week=self.prs_merged / max(1, active_devs) / weeks if active_devs else 0,
+            avg_review_iterations=round(self.review_iterations_total / max(1, self.reviewed_prs), 1),
+            commits_per_dev_per_week=self.commits / max(1, active_devs) / weeks if active_devs else 0,
+            active_developers=active_devs,
+            total_developers=total_devs,
+            commits_per_dev_per_week_p50=self._activity_quantile(commit_counts, 0.5, weeks),
+            commits_per_dev_per_week_p90=self._activity_quantile(commit_counts, 0.9, weeks),
+            commits_per_dev_per_week_p99=self._activity_quantile(commit_counts, 0.99, weeks),
+            prs_per_dev_per_week_p50=self._activity_quantile(pr_counts, 0.5, weeks),
+            prs_per_dev_per_week_p90=self._activity_quantile(pr_counts, 0.9, weeks),
+            prs_per_dev_per_week_p99=self._activity_quantile(pr_counts, 0.99, weeks),
+        )
+
+    @staticmethod
+    def _activity_quantile(counts: list[int], q: float, weeks: int) -> Optional[float]:
+        value = quantile(counts, q)
+        return round(value / weeks, 2) if value is not None else None
+
+    def quality(self) -> QualityMetrics:
+        reopen_rate = self.bugs_reopened / self.bugs_resolved * 100 if self.bugs_resolved else 0.0
+        coverage = (
+            round(self.coverage_lines_covered / self.coverage_lines_total * 100, 1)
+            if self.coverage_lines_total else None
+        )
+
+        return QualityMetrics(
+            bug_count=self.bug_count,
+            bug_reopen_rate=round(reopen_rate, 1),
+            security_blocks_caught=self.hook_counts.get("secrets", 0),
+            pii_patterns_detected=self.hook_counts.get("pii", 0),
+            test_coverage_avg=coverage,
+        )
+
+    def knowledge(self) -> KnowledgeMetrics:
+        avg_reuse = self.pattern_references / max(1, self.patterns) if self.patterns else 0
+        period_months = self.period_weeks * 7 / 30.44 if self.period_weeks else max(1, self.months)
+
+        return KnowledgeMetrics(
+            learnings_count=self.learnings,
+            patterns_count=self.patterns,
+            failures_documented=self.failures,
+            pattern_references=self.pattern_references,
+            avg_reuse_per_pattern=round(avg_reuse, 2),
+            learnings_added=self.learnings_added,
+            learnings_per_month=round(self.learnings_added / period_months, 1),
+            patterns_added=self.patterns_added,
+            patterns_promoted=self.patterns_promoted,
+            failures_added=self.failures_added,
+            knowledge_removed=self.knowledge_removed,
+            indexed_documents=self.indexed_documents,
+            indexed_terms=self.indexed_terms,
+            stale_documents=self.stale_documents,
+        )
+
+    def compliance(self) -> ComplianceMetrics:
+        return ComplianceMetrics(
+            secrets_blocked=self.hook_counts.get("secrets", 0),
+            pii_exposure_events=self.hook_counts.get("pii_exposed", 0),
+            dangerous_files_blocked=self.hook_counts.get("dangerous_files", 0),
+            security_antipatterns_warned=self.hook_counts.get("antipatterns", 0),
+        )
+
+    def adoption(self) -> AdoptionMetrics:
+        total = self.total_projects
+        percentage = (self.projects_with_claude / total * 100) if total else 0
+
+        return AdoptionMetrics(
+            projects_with_claude=self.projects_with_claude,
+            total_projects=total,
+            adoption_percentage=round(percentage, 1),
+            starter_kit_usage=self.starter_kit_usage,
+        )
+
+    def finalize(self) -> AllMetrics:
+        """Derive the final ratios and counts"""
+        return AllMetrics(
+            collected_at=self.collected_at,
+            period_start=self.period_start,
+            period_end=self.period_end,
+            is_baseline=self.is_baseline,
+            productivity=self.productivity(),
+            quality=self.quality(),
+            knowledge=self.knowledge(),
+            compliance=self.compliance(),
+            adoption=self.adoption(),
+            field_status=self.field_status(),
+            projects=sorted(self.projects, key=lambda row: row["name"]),
+        )
+
+    def to_dict(self) -> dict:
+        data = {"format": PARTIAL_FORMAT}
+        for name in self.__dataclass_fields__:
+            value = getattr(self, name)
+            if name in self.COUNTER_FIELDS and value is not None:
+                value = value.to_dict()
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PartialMetrics":
+        if data.get("format") != PARTIAL_FORMAT:
+            raise ValueError(f"Not a partial metrics file (expected format {PARTIAL_FORMAT})")
+        kwargs = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        for name in cls.COUNTER_FIELDS:
+            if kwargs.get(name) is not None:
+                kwargs[name] = distinct_counter_from_dict(kwargs[name])
+        return cls(**kwargs)
+
+
+def merge_partials(paths: list[str]) -> PartialMetrics:
+    """Merge partial result files one at a time (only one is held in memory)"""
+    merged = None
+    for path in paths:
+        with open(path) as f:
+            partial = PartialMetrics.from_dict(json.load(f))
+        if merged is None:
+            merged = partial
+            continue
+        try:
+            merged.merge(partial)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from e
+    if merged is None:
+        raise ValueError("No partial results to merge")
+    return merged
+
+
+# =============================================================================
+# Event Export
+# =============================================================================
+
+class EventWriter:
+    """Streams raw collection events as NDJSON, one record per line.
+
+    Records are written as they are produced, so memory stays flat no matter
+    how many commits or PRs are exported. Paths ending in .gz are gzipped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path.endswith(".gz"):
+            self._file: TextIO = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def emit(self, record_type: str, **fields) -> None:
+        record = {"type": record_type, **fields}
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# =============================================================================
+# Hook Event Log
+# =============================================================================
+
+# Fixed event codes written by STARTER_KIT/.hooks/hook_log.py, mapped to the
+# counters they feed. Keep in sync with EVENT_CODES there.
+HOOK_EVENT_COUNTERS = {
+    "SECRET_BLOCKED": ("secrets",),
+    "PII_WARNING": ("pii",),
+    "PII_EXPOSED": ("pii", "pii_exposed"),
+    "DANGEROUS_FILE_BLOCKED": ("dangerous_files",),
+    "ANTIPATTERN_WARNING": ("antipatterns",),
+}
+HOOK_INDEX_VERSION = 1
+# Same rule as DEFAULT_LOG_PATH in STARTER_KIT/.hooks/hook_log.py
+HOOK_LOG_ENV = "CLAUDE_METRICS_HOOK_LOG"
+HOOK_LOG_DEFAULT = "~/.claude-metrics/blocks.log"
+# Log lines indexed between checks of a caller's should_stop()
+HOOK_STOP_CHECK_LINES = 10_000
+UNDATED = "undated"
+DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def default_hook_log_path() -> str:
+    """Hook log the pre-commit hooks write to: $CLAUDE_METRICS_HOOK_LOG or ~/.claude-metrics/blocks.log"""
+    return os.environ.get(HOOK_LOG_ENV) or os.path.expanduser(HOOK_LOG_DEFAULT)
+
+
+def _classify_legacy_hook_event(event_type: str) -> Optional[str]:
+    """Map a free-form v1 event_type onto a fixed event code"""
+    event_type = event_type.upper()
+    if "SECRET" in event_type:
+        return "SECRET_BLOCKED"
+    elif "PII" in event_type:
+        return "PII_EXPOSED" if "EXPOS" in event_type else "PII_WARNING"
+    elif "DANGEROUS" in event_type:
+        return "DANGEROUS_FILE_BLOCKED"
+    elif "ANTIPATTERN" in event_type:
+        return "ANTIPATTERN_WARNING"
+    return None
+
+
+def _hook_event_day(timestamp: str) -> str:
+    if DAY_RE.match(timestamp):
+        return timestamp[:10]
+    try:
+        return datetime.fromtimestamp(float(timestamp)).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError, OSError):
+        return UNDATED
+
+
+def parse_hook_record(line: str) -> Optional[dict]:
+    """Parse one hook log line (v2 JSON or v1 timestamp,user,event_type)"""
+    line = line.strip()
+    if not line:
+        return None
+
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        code = record.get("code")
+        if not code:
+            return None
+        timestamp = str(record.get("ts", ""))
+        return {
+            "ts": timestamp,
+            "day": _hook_event_day(timestamp),
+            "code": code,
+            "repo": record.get("repo") or "",
+            "user": record.get("user") or "",
+            "file": record.get("file"),
+        }
+
+    parts = line.split(",")
+    if len(parts) < 3:
+        return None
+    code = _classify_legacy_hook_event(parts[2])
+    if code is None:
+        return None
+    return {
+        "ts": parts[0],
+        "day": _hook_event_day(parts[0]),
+        "code": code,
+        "repo": "",
+        "user": parts[1],
+        "file": None,
+    }
+
+
+class HookLogIndex:
+    """Sidecar index for the hook event log (<log>.idx).
+
+    For every day it records the byte range holding that day's events and
+    event counts by code, by user and by repo. Hooks only append to the log;
+    update() indexes just the bytes appended since the last run, and all
+    period/user/repo/code aggregations are answered from the index alone.
+    """
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.index_path = f"{log_path}.idx"
+        self.data = self._empty()
+        # Set when update() was cut short by should_stop()
+        self.stopped = False
+
+    @staticmethod
+    def _empty(inode: int = 0) -> dict:
+        return {"version": HOOK_INDEX_VERSION, "inode": inode, "indexed_bytes": 0, "days": {}}
+
+    def update(self, should_stop: Optional[Callable[[], bool]] = None) -> "HookLogIndex":
+        """Bring the index up to date with the log, reading only new bytes.
+
+        When `should_stop` returns true, indexing ends early (setting
+        `stopped`); the bytes indexed so far are saved and the rest is
+        picked up by the next run.
+        """
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            self.data = self._empty()
+            return self
+
+        try:
+            with open(self.index_path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = self._empty(st.st_ino)
+
+        # Rotated, truncated or incompatible: rebuild from scratch
+        if (
+            self.data.get("version") != HOOK_INDEX_VERSION
+            or self.data.get("inode") != st.st_ino
+            or st.st_size < self.data.get("indexed_bytes", 0)
+        ):
+            self.data = self._empty(st.st_ino)
+
+        offset = self.data["indexed_bytes"]
+        if offset == st.st_size:
+            return self
+
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                for i, raw in enumerate(f, 1):
+                    if not raw.endswith(b"\n"):
+                        break  # A hook is mid-write; pick this line up next time
+                    if should_stop and i % HOOK_STOP_CHECK_LINES == 0 and should_stop():
+                        self.stopped = True
+                        break
+                    record = parse_hook_record(raw.decode("utf-8", errors="replace"))
+                    if record:
+                        self._add(record, offset, offset + len(raw))
+                    offset += len(raw)
+        except OSError:
+            return self
+
+        self.data["indexed_bytes"] = offset
+        self._save()
+        return self
+
+    def _add(self, record: dict, start: int, end: int) -> None:
+        day = self.data["days"].setdefault(
+            record["day"], {"start": start, "end": end, "codes": {}, "users": {}, "repos": {}}
+        )
+        day["start"] = min(day["start"], start)
+        day["end"] = max(day["end"], end)
+
+        code = record["code"]
+        day["codes"][code] = day["codes"].get(code, 0) + 1
+        for key, name in (("users", record["user"]), ("repos", record["repo"])):
+            by_code = day[key].setdefault(name, {})
+            by_code[code] = by_code.get(code, 0) + 1
+
+    def _save(self) -> None:
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def _days_since(self, since_day: str) -> list[tuple[str, dict]]:
+        # Undated v1 lines were always counted before the index existed
+        return [
+            (name, day) for name, day in self.data["days"].items()
+            if name == UNDATED or name >= since_day
+        ]
+
+    def counts(self, since_day: str, user: Optional[str] = None, repo: Optional[str] = None) -> dict[str, int]:
+        """Event counts by code for days >= since_day, optionally for one user or repo"""
+        totals: dict[str, int] = {}
+        for _, day in self._days_since(since_day):
+            if user is not None:
+                by_code = day["users"].get(user, {})
+            elif repo is not None:
+                by_code = day["repos"].get(repo, {})
+            else:
+                by_code = day["codes"]
+            for code, n in by_code.items():
+                totals[code] = totals.get(code, 0) + n
+        return totals
+
+    def daily_counts(self) -> Iterator[tuple[str, dict[str, int]]]:
+        """(day, event counts by code) for every dated day in the index"""
+        for name, day in self.data["days"].items():
+            if name != UNDATED:
+                yield name, day["codes"]
+
+    def breakdown(self, since_day: str, key: str) -> dict[str, dict[str, int]]:
+        """Per-user ("users") or per-repo ("repos") event counts by code"""
+        result: dict[str, dict[str, int]] = {}
+        for _, day in self._days_since(since_day):
+            for name, by_code in day[key].items():
+                totals = result.setdefault(name, {})
+                for code, n in by_code.items():
+                    totals[code] = totals.get(code, 0) + n
+        return result
+
+    def iter_records(self, since_day: str) -> Iterator[dict]:
+        """Stream event bodies for days >= since_day, seeking past older days"""
+        days = self._days_since(since_day)
+        if not days:
+            return
+
+        start = min(day["start"] for _, day in days)
+        end = self.data["indexed_bytes"]
+        wanted = {name for name, _ in days}
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(start)
+                offset = start
+                for raw in f:
+                    offset += len(raw)
+                    if offset > end:
+                        break
+                    record = parse_hook_record(raw.decode("utf-8", errors="replace"))
+                    if record and record["day"] in wanted:
+                        yield record
+        except OSError:
+            return
+
+
+# =============================================================================
+# .claude/ Inventory
+# =============================================================================
+
+@dataclass
+class ClaudeFile:
+    """A single file inside a .claude/ knowledge directory"""
+    name: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class ClaudeInventory:
+    """Compact snapshot of one repo's .claude/ directory"""
+    exists: bool = False
+    has_claude_md: bool = False
+    dirs: dict[str, list[ClaudeFile]] = field(default_factory=dict)
+    # True when the scan was stopped before every directory was read
+    truncated: bool = False
+
+    def files(self, subdir: str, exclude: tuple[str, ...] = SKIPPED_FILES) -> list[ClaudeFile]:
+        """Files in a knowledge subdirectory, minus placeholders and templates"""
+        return [f for f in self.dirs.get(subdir, []) if f.name not in exclude]
+
+
+def scan_claude_dir(repo_path: str, should_stop: Optional[Callable[[], bool]] = None) -> ClaudeInventory:
+    """Build a .claude/ inventory with a single os.scandir pass per directory.
+
+    Each file is stat'ed exactly once and never opened; directory entry
+    types come from scandir itself, which avoids extra stat calls on
+    network filesystems. Only the knowledge directories are listed, one
+    level deep, so nested or symlinked directories are never walked.
+    `should_stop` is polled per file; when it returns true the inventory
+    is returned as is, marked `truncated`.
+    """
+    claude_dir = os.path.join(repo_path, ".claude")
+    inventory = ClaudeInventory()
+
+    try:
+        top = os.scandir(claude_dir)
+    except OSError:
+        return inventory
+
+    inventory.exists = True
+    subdirs = []
+    with top:
+        for entry in top:
+            if entry.name == "CLAUDE.md" and entry.is_file():
+                inventory.has_claude_md = True
+            elif entry.name in KNOWLEDGE_DIRS and entry.is_dir():
+                subdirs.append(entry)
+
+    for subdir in subdirs:
+        files = []
+        try:
+            with os.scandir(subdir.path) as it:
+                for entry in it:
+                    if should_stop and should_stop():
+                        inventory.truncated = True
+                        break
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue  # Symlink loop or a file removed mid-scan
+                    files.append(ClaudeFile(entry.name, st.st_size, st.st_mtime))
+        except OSError:
+            continue
+        inventory.dirs[subdir.name] = files
+        if inventory.truncated:
+            break
+
+    return inventory
+
+
+def activity_counts(per_developer: dict[str, int], population: int) -> list[int]:
+    """Sorted per-developer activity counts, padded with zeros up to `population`"""
+    counts = sorted(per_developer.values())
+    return [0] * max(0, population - len(counts)) + counts
+
+
+def quantile(sorted_values: list[int], q: float) -> Optional[int]:
+    """Nearest-rank quantile (0..1) of sorted values, or None when empty"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+# =============================================================================
+# .claude/ History
+# =============================================================================
+
+KNOWLEDGE_FLOW_KEYS = ("learnings_added", "patterns_added", "patterns_promoted", "failures_added", "knowledge_removed")
+ADDED_KEYS = {"learnings": "learnings_added", "patterns": "patterns_added", "failures": "failures_added"}
+
+
+def _knowledge_subdir(path: str) -> Optional[str]:
+    """Knowledge directory of a ".claude/<dir>/<file>" path, or None"""
+    parts = path.split("/")
+    if len(parts) != 3 or parts[0] != ".claude" or parts[1] not in KNOWLEDGE_DIRS or parts[2] in SKIPPED_FILES:
+        return None
+    return parts[1]
+
+
+def parse_knowledge_log(lines) -> dict[str, dict[str, int]]:
+    """Per-day .claude/ knowledge changes from `git log -M --name-status --format=@%cd --date=short`.
+
+    A learning renamed into patterns/, or deleted in the same commit that
+    adds a pattern, counts as a promotion rather than a removal. Renames
+    within a directory and plain edits are ignored.
+    """
+    days: dict[str, dict[str, int]] = {}
+
+    def flush(day: Optional[str], added: dict, removed: dict, renamed_promotions: int) -> None:
+        if day is None:
+            return
+        counts = days.setdefault(day, dict.fromkeys(KNOWLEDGE_FLOW_KEYS, 0))
+        # Renamed promotions are already in added["patterns"]; pair deletions only with the other new patterns
+        paired = min(removed.get("learnings", 0), added.get("patterns", 0) - renamed_promotions)
+        promotions = renamed_promotions + paired
+        for subdir, n in added.items():
+            if subdir in ADDED_KEYS:
+                counts[ADDED_KEYS[subdir]] += n
+        counts["patterns_promoted"] += promotions
+        counts["knowledge_removed"] += sum(removed.values()) - paired
+
+    day, added, removed, renamed_promotions = None, {}, {}, 0
+    for line in lines:
+        if line.startswith("@"):
+            flush(day, added, removed, renamed_promotions)
+            day, added, removed, renamed_promotions = line[1:].strip(), {}, {}, 0
+            continue
+        fields = line.rstrip("\n").split("\t")
+        status = fields[0][:1]
+        if status in ("A", "C") and len(fields) >= 2:
+            subdir = _knowledge_subdir(fields[-1])
+            if subdir:
+                added[subdir] = added.get(subdir, 0) + 1
+        elif status == "D" and len(fields) >= 2:
+            subdir = _knowledge_subdir(fields[1])
+            if subdir:
+                removed[subdir] = removed.get(subdir, 0) + 1
+        elif status == "R" and len(fields) >= 3:
+            old, new = _knowledge_subdir(fields[1]), _knowledge_subdir(fields[2])
+            if old == new:
+                continue
+            if new:
+                added[new] = added.get(new, 0) + 1
+                if old == "learnings" and new == "patterns":
+                    renamed_promotions += 1
+                    continue
+            if old:
+                removed[old] = removed.get(old, 0) + 1
+    flush(day, added, removed, renamed_promotions)
+
+    return days
+
+
+# =============================================================================
+# Backfill Periods
+# =============================================================================
+
+# Sources that only describe the present (files on disk right now)
+POINT_IN_TIME_SOURCES = ("coverage", "knowledge", "pattern_references", "knowledge_index", "adoption")
+
+# Closed-PR listing for backfills: page size and a per-repo page cap
+GITHUB_PAGE_SIZE = 100
+GITHUB_MAX_PAGES = 50
+
+
+def period_key(day: str, bucket: str) -> str:
+    """Period key for a YYYY-MM-DD day: "2025-01" (month) or "2025-W03" (ISO week)"""
+    if bucket == "month":
+        return day[:7]
+    year, week, _ = date.fromisoformat(day[:10]).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def backfill_periods(start: date, end: date, bucket: str) -> dict[str, tuple[date, date]]:
+    """Ordered period key -> (first day, day after last) covering start..end"""
+    if bucket == "month":
+        current = start.replace(day=1)
+    else:
+        current = start - timedelta(days=start.weekday())
+
+    periods = {}
+    while current <= end:
+        if bucket == "month":
+            following = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            following = current + timedelta(days=7)
+        periods[period_key(current.isoformat(), bucket)] = (current, following)
+        current = following
+    return periods
 
 
 class MetricsCollector:
@@ -101,143 +1011,592 @@ class MetricsCollector:
         github_token: Optional[str] = None,
         github_org: Optional[str] = None,
         hook_log_path: Optional[str] = None,
-        months: int = 1
+        months: int = 1,
+        distinct_mode: str = "exact",
+        hll_error: float = 0.01,
+        cache_dir: Optional[str] = None,
+        shard: Optional[tuple[int, int]] = None,
+        events: Optional[EventWriter] = None,
+        coverage_patterns: tuple[str, ...] = COVERAGE_PATTERNS,
+        issue_export_dir: Optional[str] = None,
+        deadline: Optional[float] = None,
     ):
-        self.repo_paths = repo_paths
+        self.shard_index, self.shard_count = shard or (0, 1)
+        self.repo_paths = [p for p in repo_paths if self._in_shard(os.path.basename(os.path.abspath(p)))]
         self.github_token = github_token or os.environ.get("GITHUB_TOKEN")
         self.github_org = github_org or os.environ.get("GITHUB_ORG")
-        self.hook_log_path = hook_log_path or os.path.expanduser("~/.claude-metrics/blocks.log")
+        self.hook_log_path = hook_log_path or default_hook_log_path()
         self.months = months
         self.since_date = datetime.now() - timedelta(days=30 * months)
+        self.distinct_mode = distinct_mode
+        self.hll_error = hll_error
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.events = events
+        self.coverage_patterns = coverage_patterns
+        self.issue_export_dir = issue_export_dir or os.environ.get("ISSUE_EXPORT_DIR")
+        self._issue_index: Optional[IssueIndex] = None
+        self.deadline = Deadline(deadline)
+        # Budget for the stage currently running; collect_partial() narrows it
+        self._budget = self.deadline
+        self._source_status: dict[str, dict] = {}
+        self._inventories: dict[str, ClaudeInventory] = {}
+        self._developer_sketches: dict[str, tuple[DistinctCounter, DistinctCounter]] = {}
+        # Commit events are emitted for days in [start, end) while git history is read
+        self._commit_event_days: tuple[str, Optional[str]] = (self.since_date.strftime("%Y-%m-%d"), None)
+        self._commit_events_emitted: set[str] = set()
+
+    def _emit(self, record_type: str, **fields) -> None:
+        """Export a raw event when --events is enabled"""
+        if self.events is not None:
+            self.events.emit(record_type, **fields)
+
+    def _in_shard(self, name: str) -> bool:
+        """Whether a repo (by directory or GitHub name) belongs to this shard.
+
+        Assignment hashes the name, so every agent agrees on ownership
+        regardless of the order or subset of repos it was given.
+        """
+        if self.shard_count == 1:
+            return True
+        digest = hashlib.sha1(name.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") % self.shard_count == self.shard_index
 
     def collect_all(self, is_baseline: bool = False) -> AllMetrics:
         """Collect all metrics"""
-        return AllMetrics(
-            collected_at=datetime.now().isoformat(),
-            period_start=self.since_date.isoformat(),
-            period_end=datetime.now().isoformat(),
-            is_baseline=is_baseline,
-            productivity=self.collect_productivity(),
-            quality=self.collect_quality(),
-            knowledge=self.collect_knowledge(),
-            compliance=self.collect_compliance(),
-            adoption=self.collect_adoption(),
+        return self.collect_partial(is_baseline).finalize()
+
+    def collect_partial(self, is_baseline: bool = False) -> PartialMetrics:
+        """Collect raw, mergeable counters for this collector's shard.
+
+        With a deadline, each stage gets a weighted share of the time left
+        (unused time rolls over to later stages). A stage that runs out
+        stops early and its sources are marked partial; stages that never
+        start are marked missing, so a result is always produced.
+        """
+        partial = self._new_partial(is_baseline)
+        self._source_status = {}
+
+        stages = (
+            (4, self._add_productivity_counters, ("commits", "developers", "pull_requests", "reviews")),
+            (2, self._add_quality_counters, ("issues", "coverage")),
+            (1, self._add_hook_counters, ("hook_log",)),
+            (2, self._add_knowledge_counters, ("knowledge", "pattern_references", "knowledge_index")),
+            (1, self._add_knowledge_history, ("knowledge_history",)),
+            (1, self._add_adoption_counters, ("adoption",)),
         )
+        weight_left = sum(weight for weight, _, _ in stages)
+
+        for weight, add_counters, sources in stages:
+            self._budget = self.deadline.share(weight, weight_left)
+            weight_left -= weight
+            if self.deadline.expired():
+                for source in sources:
+                    self._mark(source, MISSING, "deadline reached before collection started")
+                continue
+            add_counters(partial)
+            for source in sources:
+                self._source_status.setdefault(source, {"status": COMPLETE, "reasons": []})
+
+        if self.shard_index != 0:
+            # Leave shard-0 sources out so merging does not dilute their status
+            for source in SHARD_ZERO_SOURCES:
+                self._source_status.pop(source, None)
+
+        self._budget = self.deadline
+        partial.source_status = self._source_status
+        return partial
+
+    def collect_backfill(
+        self, start: date, end: date, bucket: str = "month", is_baseline: bool = False
+    ) -> dict[str, PartialMetrics]:
+        """Collect one PartialMetrics per month or week in start..end.
+
+        Each source is read once for the whole range and every commit, PR,
+        hook event, bug and .claude/ change is dropped into its period,
+        instead of re-collecting history once per period. Coverage, knowledge
+        totals and adoption describe the files on disk today, so they are only
+        filled in for the period containing today and marked missing elsewhere.
+        """
+        periods = backfill_periods(start, end, bucket)
+        collected_at = datetime.now().isoformat()
+        partials = {
+            key: PartialMetrics(
+                collected_at=collected_at,
+                period_start=datetime.combine(first, datetime.min.time()).isoformat(),
+                period_end=datetime.combine(following, datetime.min.time()).isoformat(),
+                is_baseline=is_baseline,
+                months=1 if bucket == "month" else 0,
+                period_weeks=1 if bucket == "week" else None,
+            )
+            for key, (first, following) in periods.items()
+        }
+        first_day = min(first for first, _ in periods.values())
+        last_day = max(following for _, following in periods.values())
+
+        def key_of(day: str) -> Optional[str]:
+            key = period_key(day, bucket)
+            return key if key in partials else None
+
+        self._source_status = {}
+        self._budget = self.deadline
+        self._commit_event_days = (first_day.isoformat(), last_day.isoformat())
+
+        self._backfill_commits(partials, key_of)
+        self._backfill_developers(partials, key_of, first_day)
+        self._backfill_pull_requests(partials, key_of, first_day)
+        self._mark("reviews", MISSING, "review iterations are not collected yet")
+
+        if self.shard_index == 0:
+            self._backfill_issues(partials, key_of)
+            self._backfill_hook_events(partials, key_of, first_day)
+        self._backfill_knowledge_history(partials, key_of)
+
+        current_key = key_of(datetime.now().strftime("%Y-%m-%d"))
+        if current_key is not None:
+            current = partials[current_key]
+            current.coverage_lines_covered, current.coverage_lines_total = self._get_test_coverage_totals()
+            self._add_knowledge_counters(current)
+            self._add_adoption_counters(current, (current.period_start[:10], current.period_end[:10]))
+
+        for source in ("commits", "developers", "pull_requests", "issues", "hook_log", "knowledge_history",
+                       *POINT_IN_TIME_SOURCES):
+            self._source_status.setdefault(source, {"status": COMPLETE, "reasons": []})
+        if self.shard_index != 0:
+            for source in SHARD_ZERO_SOURCES:
+                self._source_status.pop(source, None)
+
+        for key, partial in partials.items():
+            partial.total_projects = len(self.repo_paths)
+            partial.source_status = {source: dict(status, reasons=list(status["reasons"]))
+                                     for source, status in self._source_status.items()}
+            if key != current_key:
+                for source in POINT_IN_TIME_SOURCES:
+                    partial.source_status[source] = {
+                        "status": MISSING,
+                        "reasons": ["current-state source; not reconstructed for past periods"],
+                    }
+        return partials
+
+    def _backfill_knowledge_history(self, partials: dict[str, PartialMetrics], key_of) -> None:
+        """Bucket each repo's cached per-day .claude/ changes into periods"""
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("knowledge_history", i, len(self.repo_paths)):
+                break
+            for day, counts in self._get_knowledge_days(repo_path).items():
+                key = key_of(day)
+                if key is not None:
+                    for name, n in counts.items():
+                        setattr(partials[key], name, getattr(partials[key], name) + n)
+
+    def _backfill_commits(self, partials: dict[str, PartialMetrics], key_of) -> None:
+        """Bucket each repo's per-day commit counts into periods, per author"""
+        per_author: dict[str, dict[str, int]] = {key: {} for key in partials}
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("commits", i, len(self.repo_paths)):
+                break
+            for day, authors in self._get_history_days(repo_path, "commits")[1].items():
+                key = key_of(day)
+                if key is None:
+                    continue
+                for author, n in authors.items():
+                    partials[key].commits += n
+                    per_author[key][author] = per_author[key].get(author, 0) + n
+
+        for key, counts in per_author.items():
+            partials[key].commit_activity = counts
+
+    def _backfill_developers(self, partials: dict[str, PartialMetrics], key_of, first_day: date) -> None:
+        """Active developers per period and the running all-time total at each period end.
+
+        Built from the cached per-day counters: each period's active set is
+        the union of its days, and the total is everything before the range
+        plus every period so far.
+        """
+        before = make_distinct_counter(self.distinct_mode, self.hll_error)
+        for partial in partials.values():
+            partial.active_developers = make_distinct_counter(self.distinct_mode, self.hll_error)
+
+        first = first_day.isoformat()
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("developers", i, len(self.repo_paths)):
+                break
+            for day, counter in self._get_history_days(repo_path)[0].items():
+                if day < first:
+                    before.merge(counter)
+                    continue
+                key = key_of(day)
+                if key is not None:
+                    partials[key].active_developers.merge(counter)
+
+        running = before
+        for partial in partials.values():
+            running.merge(partial.active_developers)
+            partial.total_developers = running.copy()
+
+        total = os.environ.get("TOTAL_DEVELOPERS")
+        if total:
+            for partial in partials.values():
+                partial.total_developers_override = int(total)
+
+    def _backfill_pull_requests(self, partials: dict[str, PartialMetrics], key_of, first_day: date) -> None:
+        """One closed-PR listing per repo, bucketed by merge date (count) and open date (cycle time)"""
+        if not self.github_token or not self.github_org:
+            self._mark("pull_requests", MISSING, "GITHUB_TOKEN/GITHUB_ORG not set")
+            return
+
+        per_author: dict[str, dict[str, int]] = {key: {} for key in partials}
+        for repo in self._get_github_repos():
+            for pr in self._iter_closed_prs(repo["name"], first_day):
+                if not pr.get("merged_at"):
+                    continue
+                merged_key = key_of(pr["merged_at"][:10])
+                if merged_key is not None:
+                    partials[merged_key].prs_merged += 1
+                    login = (pr.get("user") or {}).get("login") or ""
+                    per_author[merged_key][login] = per_author[merged_key].get(login, 0) + 1
+                    self._emit(
+                        "pr_merged",
+                        repo=repo["name"],
+                        number=pr.get("number"),
+                        author=(pr.get("user") or {}).get("login"),
+                        created_at=pr.get("created_at"),
+                        merged_at=pr["merged_at"],
+                    )
+
+                created_key = key_of(pr["created_at"][:10]) if pr.get("created_at") else None
+                if created_key is not None:
+                    created = datetime.fromisoformat(pr["created_at"].replace("Z", "+00:00"))
+                    merged = datetime.fromisoformat(pr["merged_at"].replace("Z", "+00:00"))
+                    partials[created_key].pr_cycle_seconds_total += int((merged - created).total_seconds())
+                    partials[created_key].pr_cycle_count += 1
+
+        for key, counts in per_author.items():
+            partials[key].pr_activity = counts
+
+    def _backfill_issues(self, partials: dict[str, PartialMetrics], key_of) -> None:
+        index = self._get_issue_index()
+        if index is None:
+            return
+        for key, (created, reopened, resolved) in index.bug_totals_by(key_of).items():
+            partials[key].bug_count = created
+            partials[key].bugs_reopened = reopened
+            partials[key].bugs_resolved = resolved
+
+    def _backfill_hook_events(self, partials: dict[str, PartialMetrics], key_of, first_day: date) -> None:
+        """Per-period hook counts from the day entries of the log index (or, with --events, the exported records)"""
+        if not os.path.exists(self.hook_log_path):
+            self._mark("hook_log", MISSING, f"hook log not found: {self.hook_log_path}")
+        for partial in partials.values():
+            partial.hook_counts = dict.fromkeys(HOOK_COUNT_KEYS, 0)
+
+        index = self._get_hook_index()
+        if self.events is None:
+            daily = index.daily_counts()
+        else:
+            daily = self._stream_hook_events(
+                index, first_day.isoformat(), lambda day: day != UNDATED and key_of(day) is not None
+            ).items()
+        for day, codes in daily:
+            key = key_of(day)
+            if key is None:
+                continue
+            counts = partials[key].hook_counts
+            for code, n in codes.items():
+                for counter in HOOK_EVENT_COUNTERS.get(code, ()):
+                    counts[counter] += n
 
     def collect_productivity(self) -> ProductivityMetrics:
         """Collect productivity metrics from Git and GitHub"""
-        pr_cycle_time = self._get_pr_cycle_time()
-        prs_merged = self._get_prs_merged()
-        active_devs = self._get_active_developers()
-        total_devs = self._get_total_developers()
-        commits = self._get_commit_count()
-        weeks = max(1, self.months * 4)
-
-        return ProductivityMetrics(
-            pr_cycle_time_hours=pr_cycle_time,
-            prs_per_dev_per_week=prs_merged / max(1, active_devs) / weeks if active_devs else 0,
-            avg_review_iterations=self._get_review_iterations(),
-            commits_per_dev_per_week=commits / max(1, active_devs) / weeks if active_devs else 0,
-            active_developers=active_devs,
-            total_developers=total_devs,
-        )
+        partial = self._new_partial()
+        self._add_productivity_counters(partial)
+        return partial.productivity()
 
     def collect_quality(self) -> QualityMetrics:
         """Collect quality metrics"""
-        hook_data = self._parse_hook_logs()
-
-        return QualityMetrics(
-            bug_count=self._get_bug_count(),
-            bug_reopen_rate=self._get_bug_reopen_rate(),
-            security_blocks_caught=hook_data.get("secrets", 0),
-            pii_patterns_detected=hook_data.get("pii", 0),
-            test_coverage_avg=self._get_test_coverage(),
-        )
+        partial = self._new_partial()
+        self._add_quality_counters(partial)
+        self._add_hook_counters(partial)
+        return partial.quality()
 
     def collect_knowledge(self) -> KnowledgeMetrics:
         """Collect knowledge flywheel metrics"""
-        learnings = 0
-        patterns = 0
-        failures = 0
-        references = 0
-
-        for repo_path in self.repo_paths:
-            claude_dir = Path(repo_path) / ".claude"
-            if claude_dir.exists():
-                learnings += self._count_files(claude_dir / "learnings")
-                patterns += self._count_files(claude_dir / "patterns", exclude=[".gitkeep", "TEMPLATE.md"])
-                failures += self._count_files(claude_dir / "failures", exclude=[".gitkeep", "TEMPLATE.md"])
-                references += self._count_pattern_references(repo_path)
-
-        avg_reuse = references / max(1, patterns) if patterns else 0
-
-        return KnowledgeMetrics(
-            learnings_count=learnings,
-            patterns_count=patterns,
-            failures_documented=failures,
-            pattern_references=references,
-            avg_reuse_per_pattern=round(avg_reuse, 2),
-        )
+        partial = self._new_partial()
+        self._add_knowledge_counters(partial)
+        self._add_knowledge_history(partial)
+        return partial.knowledge()
 
     def collect_compliance(self) -> ComplianceMetrics:
         """Collect compliance metrics from hook logs"""
-        hook_data = self._parse_hook_logs()
-
-        return ComplianceMetrics(
-            secrets_blocked=hook_data.get("secrets", 0),
-            pii_exposure_events=hook_data.get("pii_exposed", 0),
-            dangerous_files_blocked=hook_data.get("dangerous_files", 0),
-            security_antipatterns_warned=hook_data.get("antipatterns", 0),
-        )
+        partial = self._new_partial()
+        self._add_hook_counters(partial)
+        return partial.compliance()
 
     def collect_adoption(self) -> AdoptionMetrics:
         """Collect adoption metrics"""
-        projects_with_claude = 0
-        starter_kit_usage = 0
+        partial = self._new_partial()
+        self._add_adoption_counters(partial)
+        return partial.adoption()
 
-        for repo_path in self.repo_paths:
-            claude_dir = Path(repo_path) / ".claude"
-            if claude_dir.exists():
-                projects_with_claude += 1
-                # Check for starter kit markers
-                if (claude_dir / "CLAUDE.md").exists():
-                    starter_kit_usage += 1
+    # =========================================================================
+    # Raw Counters
+    # =========================================================================
 
-        total = len(self.repo_paths)
-        percentage = (projects_with_claude / total * 100) if total else 0
+    def _mark(self, source: str, status: str, reason: str) -> None:
+        """Record that a data source is partial or missing, and why"""
+        record = {"status": status, "reasons": [reason]}
+        current = self._source_status.get(source)
+        if current is None:
+            self._source_status[source] = record
+        else:
+            # Worst status wins within one run
+            worst = MISSING if MISSING in (current["status"], status) else PARTIAL
+            if reason not in current["reasons"]:
+                current["reasons"].append(reason)
+            current["status"] = worst
+
+    def _out_of_time(self, source: str, done: int, total: int) -> bool:
+        """Check the stage budget inside a per-repo loop, marking the source if exhausted"""
+        if not self._budget.expired():
+            return False
+        self._mark(source, PARTIAL if done else MISSING, f"deadline reached after {done}/{total} repos")
+        return True
+
+    def _new_partial(self, is_baseline: bool = False) -> PartialMetrics:
+        now = datetime.now().isoformat()
+        return PartialMetrics(
+            collected_at=now,
+            period_start=self.since_date.isoformat(),
+            period_end=now,
+            is_baseline=is_baseline,
+            months=self.months,
+        )
 
-        return AdoptionMetrics(
-            projects_with_claude=projects_with_claude,
-            total_projects=total,
-            adoption_percentage=round(percentage, 1),
-            starter_kit_usage=starter_kit_usage,
+    def _add_productivity_counters(self, partial: PartialMetrics) -> None:
+        partial.pr_cycle_seconds_total, partial.pr_cycle_count = self._get_pr_cycle_totals()
+        partial.prs_merged = self._get_prs_merged(partial.pr_activity)
+        partial.review_iterations_total, partial.reviewed_prs = self._get_review_iteration_totals()
+        partial.commits = self._get_commit_count(partial.commit_activity)
+        partial.active_developers = self._get_developer_union(0)
+        partial.total_developers = self._get_developer_union(1)
+
+        total = os.environ.get("TOTAL_DEVELOPERS")
+        if total:
+            partial.total_developers_override = int(total)
+
+        if not self.github_token or not self.github_org:
+            self._mark("pull_requests", MISSING, "GITHUB_TOKEN/GITHUB_ORG not set")
+        self._mark("reviews", MISSING, "review iterations are not collected yet")
+
+    def _add_quality_counters(self, partial: PartialMetrics) -> None:
+        partial.bug_count = self._get_bug_count()
+        partial.bugs_reopened, partial.bugs_resolved = self._get_bug_reopen_totals()
+        partial.coverage_lines_covered, partial.coverage_lines_total = self._get_test_coverage_totals()
+
+    def _add_hook_counters(self, partial: PartialMetrics) -> None:
+        # The hook log is a single fleet-wide file, so only shard 0 reads it
+        if self.shard_index == 0:
+            partial.hook_counts = self._parse_hook_logs()
+
+    def _add_knowledge_counters(self, partial: PartialMetrics) -> None:
+        indexed_repos = 0
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("knowledge", i, len(self.repo_paths)):
+                for source in ("pattern_references", "knowledge_index"):
+                    self._mark(source, PARTIAL if i else MISSING, "deadline reached")
+                break
+            inventory = self._get_inventory(repo_path)
+            if inventory.exists:
+                partial.learnings += len(inventory.files("learnings"))
+                partial.patterns += len(inventory.files("patterns"))
+                partial.failures += len(inventory.files("failures"))
+                partial.pattern_references += self._count_pattern_references(repo_path)
+                if self.cache_dir:
+                    indexed_repos += self._add_index_stats(partial, repo_path, inventory)
+
+        if not self.cache_dir:
+            self._mark("knowledge_index", MISSING, "search indexes are not read with --no-cache")
+        elif not indexed_repos:
+            self._mark("knowledge_index", MISSING, "no search index built (knowledge_index.py build)")
+
+    def _add_index_stats(self, partial: PartialMetrics, repo_path: str, inventory: ClaudeInventory) -> bool:
+        """Add the size and staleness of the repo's /search-knowledge index.
+
+        The index is read from <cache dir>/knowledge/, where knowledge_index.py
+        writes it when the default cache directory is used. Staleness is
+        judged from the inventory's size/mtime, so no file is stat'ed twice.
+        Terms are summed per repo (each repo has its own index). Returns
+        whether the repo has an index.
+        """
+        index = KnowledgeIndex(repo_path, default_index_path(repo_path, os.path.join(self.cache_dir, "knowledge")))
+        current_files = {
+            f"{subdir}/{f.name}": (f.size, f.mtime)
+            for subdir in KNOWLEDGE_DIRS
+            for f in inventory.files(subdir)
+        }
+        if not index.exists:
+            # Everything on disk is unsearchable until the index is built
+            partial.stale_documents += len(current_files)
+            return False
+        stats = index.stats(current_files)
+        partial.indexed_documents += stats["documents"]
+        partial.indexed_terms += stats["terms"]
+        partial.stale_documents += stats["stale_documents"]
+        return True
+
+    def _add_knowledge_history(self, partial: PartialMetrics) -> None:
+        since = self.since_date.strftime("%Y-%m-%d")
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("knowledge_history", i, len(self.repo_paths)):
+                break
+            for day, counts in self._get_knowledge_days(repo_path).items():
+                if day >= since:
+                    for key, n in counts.items():
+                        setattr(partial, key, getattr(partial, key) + n)
+
+    def _add_adoption_counters(self, partial: PartialMetrics, period: Optional[tuple[str, str]] = None) -> None:
+        """Adoption counters and project rows; `period` is a backfilled (first day, following day) range"""
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("adoption", i, len(self.repo_paths)):
+                break
+            inventory = self._get_inventory(repo_path, "adoption")
+            if inventory.exists:
+                partial.projects_with_claude += 1
+                # Check for starter kit markers
+                if inventory.has_claude_md:
+                    partial.starter_kit_usage += 1
+            partial.projects.append(asdict(self._project_row(repo_path, inventory, period)))
+
+        partial.total_projects = len(self.repo_paths)
+
+    def _project_row(
+        self, repo_path: str, inventory: ClaudeInventory, period: Optional[tuple[str, str]] = None
+    ) -> ProjectRow:
+        """Dashboard row for one repo (team size = developers active in the period).
+
+        The period is the --months window unless `period` gives a backfilled
+        period's (first day, following day).
+        """
+        patterns = len(inventory.files("patterns"))
+        learnings = len(inventory.files("learnings"))
+        if not inventory.exists:
+            status = "not_started"
+        elif inventory.has_claude_md and (patterns or learnings):
+            status = "active"
+        else:
+            status = "onboarding"
+
+        name = os.path.basename(os.path.abspath(repo_path))
+        if period is None and (repo_path in self._developer_sketches or not self._budget.expired()):
+            team_size = self._get_developer_sketches(repo_path, source="adoption")[0].count()
+        elif period is not None and not self._budget.expired():
+            team = make_distinct_counter(self.distinct_mode, self.hll_error)
+            for day, counter in self._get_history_days(repo_path, source="adoption")[0].items():
+                if period[0] <= day < period[1]:
+                    team.merge(counter)
+            team_size = team.count()
+        else:
+            # Reading the history now would overrun the stage budget
+            team_size = 0
+            self._mark("adoption", PARTIAL, f"deadline reached before counting the team of {name}")
+
+        return ProjectRow(
+            name=name,
+            team_size=team_size,
+            has_claude=inventory.exists,
+            starter_kit=inventory.has_claude_md,
+            patterns=patterns,
+            learnings=learnings,
+            status=status,
         )
 
     # =========================================================================
     # Helper Methods - Git
     # =========================================================================
 
-    def _get_active_developers(self) -> int:
-        """Count developers with commits in the period"""
-        developers = set()
-        since = self.since_date.strftime("%Y-%m-%d")
+    def _run_git(self, repo_path: str, *args: str, source: Optional[str] = None) -> Optional[str]:
+        """Run a git command in a repo, returning stdout or None on failure.
 
-        for repo_path in self.repo_paths:
+        The call is bounded by the current stage budget. When `source` is
+        given, timeouts and failures are recorded against it.
+        """
+        repo = os.path.basename(os.path.abspath(repo_path))
+        if self._budget.expired():
+            if source:
+                self._mark(source, PARTIAL, f"deadline reached before git {args[0]} in {repo}")
+            return None
+        try:
+            result = subprocess.run(
+                ["git", *args],
+                cwd=repo_path,
+                capture_output=True,
+                text=True,
+                timeout=self._budget.timeout(),
+            )
+        except subprocess.TimeoutExpired:
+            if source:
+                self._mark(source, PARTIAL, f"git {args[0]} timed out in {repo}")
+            return None
+        except Exception as e:
+            if source:
+                self._mark(source, PARTIAL, f"git {args[0]} failed in {repo}: {e}")
+            return None
+
+        if result.returncode != 0:
+            if source:
+                self._mark(source, PARTIAL, f"git {args[0]} failed in {repo}")
+            return None
+        return result.stdout
+
+    def _iter_git(self, repo_path: str, *args: str, source: Optional[str] = None) -> Iterator[str]:
+        """Stream a git command's stdout line by line within the stage budget.
+
+        git is killed when the budget runs out. Timeouts and failures are
+        marked against `source` and raised (TimeoutExpired, CalledProcessError
+        or OSError) after the lines read so far, so callers can tell a
+        complete read from a cut-short one.
+        """
+        repo = os.path.basename(os.path.abspath(repo_path))
+        timeout = self._budget.timeout()
+        try:
+            if self._budget.expired():
+                raise subprocess.TimeoutExpired(["git", *args], 0)
+            proc = subprocess.Popen(
+                ["git", *args],
+                cwd=repo_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            timer = threading.Timer(timeout, proc.kill) if timeout is not None else None
+            if timer is not None:
+                timer.start()
             try:
-                result = subprocess.run(
-                    ["git", "log", f"--since={since}", "--format=%ae"],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True,
-                )
-                if result.returncode == 0:
-                    developers.update(result.stdout.strip().split("\n"))
-            except Exception:
-                pass
+                with proc:
+                    try:
+                        for line in proc.stdout:
+                            yield line.rstrip("\n")
+                    except GeneratorExit:
+                        proc.kill()
+                        raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+            if proc.returncode != 0:
+                if self._budget.expired():
+                    raise subprocess.TimeoutExpired(["git", *args], timeout)
+                raise subprocess.CalledProcessError(proc.returncode, ["git", *args])
+        except subprocess.TimeoutExpired:
+            if source:
+                self._mark(source, PARTIAL, f"git {args[0]} timed out in {repo}")
+            raise
+        except (OSError, subprocess.SubprocessError) as e:
+            if source:
+                self._mark(source, PARTIAL, f"git {args[0]} failed in {repo}: {e}")
+            raise
 
-        # Remove empty strings
-        developers.discard("")
-        return len(developers)
+    def _get_active_developers(self) -> int:
+        """Count developers with commits in the period"""
+        return union_count(self._get_developer_sketches(repo)[0] for repo in self.repo_paths)
 
     def _get_total_developers(self) -> int:
         """Get total developers (from env or count all-time)"""
@@ -246,40 +1605,196 @@ class MetricsCollector:
             return int(total)
 
         # Fall back to counting all-time contributors
-        developers = set()
-        for repo_path in self.repo_paths:
-            try:
-                result = subprocess.run(
-                    ["git", "log", "--format=%ae"],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True,
-                )
-                if result.returncode == 0:
-                    developers.update(result.stdout.strip().split("\n"))
-            except Exception:
-                pass
+        return union_count(self._get_developer_sketches(repo)[1] for repo in self.repo_paths)
+
+    def _get_developer_union(self, which: int) -> DistinctCounter:
+        """Union of per-repo developer counters (0 = active in period, 1 = all-time)"""
+        union = make_distinct_counter(self.distinct_mode, self.hll_error)
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("developers", i, len(self.repo_paths)):
+                break
+            union.merge(self._get_developer_sketches(repo_path)[which])
+        return union
+
+    def _get_developer_sketches(
+        self, repo_path: str, source: str = "developers"
+    ) -> tuple[DistinctCounter, DistinctCounter]:
+        """Get (active in period, all-time) developer counters for a repo.
+
+        Both are unions of the repo's per-day counters, so only the two
+        unions stay in memory once a repo has been processed. Git timeouts
+        and failures are marked against `source`.
+        """
+        if repo_path not in self._developer_sketches:
+            since = self.since_date.strftime("%Y-%m-%d")
+            active = make_distinct_counter(self.distinct_mode, self.hll_error)
+            total = make_distinct_counter(self.distinct_mode, self.hll_error)
+            for day, counter in self._get_history_days(repo_path, source)[0].items():
+                total.merge(counter)
+                if day >= since:
+                    active.merge(counter)
+            self._developer_sketches[repo_path] = (active, total)
+        return self._developer_sketches[repo_path]
+
+    def _get_history_days(
+        self, repo_path: str, source: str = "developers"
+    ) -> tuple[dict[str, DistinctCounter], dict[str, dict[str, int]]]:
+        """Get per-day distinct author counters and per-day commit counts by author for a repo.
+
+        Both come from a single streamed `git log` pass, which also emits the
+        commit events. They are cached per repo together with the HEAD they
+        cover. When HEAD has moved forward only the new commits are read:
+        adding an author to a distinct counter is idempotent, and the new
+        commits are not counted yet. A log that fails or runs out of time is
+        used as far as it got but never cached.
+        """
+        head = (self._run_git(repo_path, "rev-parse", "HEAD", source=source) or "").strip()
+        if not head:
+            return {}, {}
+
+        cache_file = self._developer_cache_file(repo_path)
+        developers: dict[str, DistinctCounter] = {}
+        commits: dict[str, dict[str, int]] = {}
+        cached_head = None
+
+        cached = self._load_json_cache(cache_file)
+        if (
+            cached
+            and cached.get("mode") == self.distinct_mode
+            and cached.get("hll_error") == self.hll_error
+            and "commits" in cached
+            and cached.get("head")
+        ):
+            if cached["head"] == head or self._run_git(
+                repo_path, "merge-base", "--is-ancestor", cached["head"], head
+            ) is not None:
+                cached_head = cached["head"]
+                developers = {day: distinct_counter_from_dict(d) for day, d in cached["days"].items()}
+                commits = cached["commits"]
+
+        emit_events = self.events is not None and repo_path not in self._commit_events_emitted
+        if emit_events:
+            self._commit_events_emitted.add(repo_path)
+            if cached_head:
+                self._replay_commit_events(repo_path, cached_head, source)
+        if cached_head == head:
+            return developers, commits
+
+        repo = os.path.basename(os.path.abspath(repo_path))
+        rev_range = f"{cached_head}..{head}" if cached_head else head
+        try:
+            for line in self._iter_git(repo_path, "log", rev_range, "--format=%H %cI %ae", source=source):
+                sha, _, rest = line.partition(" ")
+                committed_at, _, email = rest.partition(" ")
+                if not email:
+                    continue
+                day = committed_at[:10]
+                if day not in developers:
+                    developers[day] = make_distinct_counter(self.distinct_mode, self.hll_error)
+                developers[day].add(email)
+                authors = commits.setdefault(day, {})
+                authors[email] = authors.get(email, 0) + 1
+                if emit_events:
+                    self._emit_commit(repo, sha, committed_at, email)
+        except (OSError, subprocess.SubprocessError):
+            return developers, commits
+
+        self._save_json_cache(cache_file, {
+            "mode": self.distinct_mode,
+            "hll_error": self.hll_error,
+            "head": head,
+            "days": {day: counter.to_dict() for day, counter in developers.items()},
+            "commits": commits,
+        })
+        return developers, commits
+
+    def _replay_commit_events(self, repo_path: str, rev: str, source: str) -> None:
+        """Emit commit events for history already counted in the cache.
+
+        Only the event window is read: `--since`/`--until` stop the walk at
+        its edges. They compare in local time while days use the committer's
+        offset, so the bounds are padded by a day and filtered exactly here.
+        """
+        event_start, event_end = self._commit_event_days
+        padding = timedelta(days=1)
+        args = ["log", rev, "--format=%H %cI %ae", f"--since={date.fromisoformat(event_start) - padding}"]
+        if event_end is not None:
+            args.append(f"--until={date.fromisoformat(event_end) + padding}")
+
+        repo = os.path.basename(os.path.abspath(repo_path))
+        try:
+            for line in self._iter_git(repo_path, *args, source=source):
+                sha, _, rest = line.partition(" ")
+                committed_at, _, email = rest.partition(" ")
+                if email:
+                    self._emit_commit(repo, sha, committed_at, email)
+        except (OSError, subprocess.SubprocessError):
+            pass
 
-        developers.discard("")
-        return len(developers)
+    def _emit_commit(self, repo: str, sha: str, committed_at: str, email: str) -> None:
+        """Export one commit event if it falls inside the event window"""
+        event_start, event_end = self._commit_event_days
+        day = committed_at[:10]
+        if day >= event_start and (event_end is None or day < event_end):
+            self._emit("commit", repo=repo, sha=sha, author=email, committed_at=committed_at)
+
+    def _get_knowledge_days(self, repo_path: str) -> dict[str, dict[str, int]]:
+        """Get per-day .claude/ knowledge changes for a repo (see parse_knowledge_log).
+
+        One `git log --name-status` pass restricted to .claude/, cached with
+        the HEAD it covers. When HEAD has moved forward only the new commit
+        range is read and its counts are added to the cached days.
+        """
+        head = (self._run_git(repo_path, "rev-parse", "HEAD", source="knowledge_history") or "").strip()
+        if not head:
+            return {}
+
+        cache_file = (
+            os.path.join(self.cache_dir, "knowledge_history", f"{self._cache_key(repo_path)}.json")
+            if self.cache_dir else None
+        )
+        days: dict[str, dict[str, int]] = {}
+        rev_range = "HEAD"
+
+        cached = self._load_json_cache(cache_file)
+        if cached:
+            cached_head = cached.get("head")
+            if cached_head == head:
+                return cached["days"]
+            if cached_head and self._run_git(repo_path, "merge-base", "--is-ancestor", cached_head, head) is not None:
+                days = cached["days"]
+                rev_range = f"{cached_head}..{head}"
+
+        log = self._run_git(
+            repo_path, "log", rev_range, "-M", "--name-status", "--format=@%cd", "--date=short",
+            "--", ".claude/", source="knowledge_history",
+        )
+        if log is None:
+            return days
+
+        for day, counts in parse_knowledge_log(log.splitlines()).items():
+            existing = days.setdefault(day, dict.fromkeys(KNOWLEDGE_FLOW_KEYS, 0))
+            for key, n in counts.items():
+                existing[key] = existing.get(key, 0) + n
+
+        self._save_json_cache(cache_file, {"head": head, "days": days})
+        return days
 
-    def _get_commit_count(self) -> int:
-        """Count commits in the period"""
+    def _get_commit_count(self, per_author: Optional[dict[str, int]] = None) -> int:
+        """Count commits in the period, optionally tallying them per author email"""
         total = 0
         since = self.since_date.strftime("%Y-%m-%d")
 
-        for repo_path in self.repo_paths:
-            try:
-                result = subprocess.run(
-                    ["git", "rev-list", "--count", f"--since={since}", "HEAD"],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True,
-                )
-                if result.returncode == 0:
-                    total += int(result.stdout.strip())
-            except Exception:
-                pass
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("commits", i, len(self.repo_paths)):
+                break
+            for day, authors in self._get_history_days(repo_path, "commits")[1].items():
+                if day < since:
+                    continue
+                for author, n in authors.items():
+                    total += n
+                    if per_author is not None:
+                        per_author[author] = per_author.get(author, 0) + n
 
         return total
 
@@ -291,6 +1806,9 @@ class MetricsCollector:
         """Make GitHub API request"""
         if not self.github_token:
             return None
+        if self._budget.expired():
+            self._mark("pull_requests", PARTIAL, f"deadline reached before GET {endpoint}")
+            return None
 
         url = f"https://api.github.com{endpoint}"
         headers = {
@@ -300,26 +1818,52 @@ class MetricsCollector:
 
         try:
             req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=10) as response:
+            with urllib.request.urlopen(req, timeout=self._budget.timeout(cap=10)) as response:
                 return json.loads(response.read().decode())
-        except urllib.error.URLError:
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            self._mark("pull_requests", PARTIAL, f"GET {endpoint} failed: {e}")
             return None
 
-    def _get_pr_cycle_time(self) -> float:
-        """Get average PR cycle time in hours"""
-        if not self.github_token or not self.github_org:
-            return 0.0
-
-        total_hours = 0
-        pr_count = 0
-        since = self.since_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+    def _iter_closed_prs(self, repo: str, first_day: date) -> Iterator[dict]:
+        """Closed PRs of a repo, most recently updated first, back to `first_day`.
 
-        # Get repos in org
+        GitHub cannot sort by close date, but closed_at <= updated_at, so once
+        a page ends with a PR last updated before `first_day` no later page
+        can hold a PR closed in the range. A failed page or the page cap
+        marks pull_requests partial.
+        """
+        since = first_day.isoformat()
+        for page in range(1, GITHUB_MAX_PAGES + 1):
+            prs = self._github_request(
+                f"/repos/{self.github_org}/{repo}/pulls?state=closed&sort=updated&direction=desc"
+                f"&per_page={GITHUB_PAGE_SIZE}&page={page}"
+            )
+            if prs is None:
+                self._mark("pull_requests", PARTIAL, f"closed PRs of {repo} listed only up to page {page - 1}")
+                return
+            yield from prs
+            if len(prs) < GITHUB_PAGE_SIZE or (prs[-1].get("updated_at") or "")[:10] < since:
+                return
+        self._mark("pull_requests", PARTIAL, f"closed PRs of {repo} capped at {GITHUB_MAX_PAGES} pages")
+
+    def _get_github_repos(self) -> list[dict]:
+        """Org repos to sample for PR metrics, restricted to this shard"""
         repos = self._github_request(f"/orgs/{self.github_org}/repos?per_page=100")
         if not repos:
-            return 0.0
+            return []
+
+        # Limit to first 10 repos for speed
+        return [repo for repo in repos[:10] if self._in_shard(repo["name"])]
+
+    def _get_pr_cycle_totals(self) -> tuple[int, int]:
+        """Get (total PR open-to-merge seconds, PR count) for the period"""
+        if not self.github_token or not self.github_org:
+            return 0, 0
+
+        total_seconds = 0
+        pr_count = 0
 
-        for repo in repos[:10]:  # Limit to first 10 repos for speed
+        for repo in self._get_github_repos():
             prs = self._github_request(
                 f"/repos/{self.github_org}/{repo['name']}/pulls?state=closed&per_page=50"
             )
@@ -332,23 +1876,18 @@ class MetricsCollector:
                     merged = datetime.fromisoformat(pr["merged_at"].replace("Z", "+00:00"))
 
                     if created >= self.since_date.replace(tzinfo=created.tzinfo):
-                        hours = (merged - created).total_seconds() / 3600
-                        total_hours += hours
+                        total_seconds += int((merged - created).total_seconds())
                         pr_count += 1
 
-        return round(total_hours / max(1, pr_count), 1)
+        return total_seconds, pr_count
 
-    def _get_prs_merged(self) -> int:
-        """Count merged PRs in period"""
+    def _get_prs_merged(self, per_author: Optional[dict[str, int]] = None) -> int:
+        """Count merged PRs in period, optionally tallying them per author login"""
         if not self.github_token or not self.github_org:
             return 0
 
         total = 0
-        repos = self._github_request(f"/orgs/{self.github_org}/repos?per_page=100")
-        if not repos:
-            return 0
-
-        for repo in repos[:10]:
+        for repo in self._get_github_repos():
             prs = self._github_request(
                 f"/repos/{self.github_org}/{repo['name']}/pulls?state=closed&per_page=100"
             )
@@ -358,69 +1897,177 @@ class MetricsCollector:
                         merged = datetime.fromisoformat(pr["merged_at"].replace("Z", "+00:00"))
                         if merged >= self.since_date.replace(tzinfo=merged.tzinfo):
                             total += 1
+                            if per_author is not None:
+                                login = (pr.get("user") or {}).get("login") or ""
+                                per_author[login] = per_author.get(login, 0) + 1
+                            self._emit(
+                                "pr_merged",
+                                repo=repo["name"],
+                                number=pr.get("number"),
+                                author=(pr.get("user") or {}).get("login"),
+                                created_at=pr.get("created_at"),
+                                merged_at=pr["merged_at"],
+                            )
 
         return total
 
-    def _get_review_iterations(self) -> float:
-        """Get average review iterations (comments before merge)"""
+    def _get_review_iteration_totals(self) -> tuple[int, int]:
+        """Get (total review iterations, reviewed PR count)"""
         # Simplified: would need to count review comments per PR
-        return 0.0
+        return 0, 0
 
     # =========================================================================
     # Helper Methods - Quality
     # =========================================================================
 
+    def _get_issue_index(self) -> Optional[IssueIndex]:
+        """Load the issue export index, absorbing any new export files"""
+        if not self.issue_export_dir or not os.path.isdir(self.issue_export_dir):
+            self._mark("issues", MISSING, "no issue export directory configured")
+            return None
+
+        if self._issue_index is None:
+            # One index per export directory, so switching directories never mixes exports
+            cache_file = (
+                os.path.join(self.cache_dir, "issues", f"{self._cache_key(self.issue_export_dir)}.json")
+                if self.cache_dir else None
+            )
+            self._issue_index = IssueIndex(self._load_json_cache(cache_file))
+            if self._issue_index.update(self.issue_export_dir, self._budget.expired):
+                self._save_json_cache(cache_file, self._issue_index.data)
+            if self._issue_index.stopped:
+                self._mark("issues", PARTIAL, "deadline reached while reading issue exports")
+            for error in self._issue_index.errors:
+                self._mark("issues", PARTIAL, f"unreadable export {error}")
+        return self._issue_index
+
     def _get_bug_count(self) -> int:
-        """Get bug count (requires JIRA/Linear integration)"""
-        # Placeholder - implement with your issue tracker
-        return 0
-
-    def _get_bug_reopen_rate(self) -> float:
-        """Get bug reopen rate (requires JIRA/Linear integration)"""
-        # Placeholder - implement with your issue tracker
-        return 0.0
-
-    def _get_test_coverage(self) -> Optional[float]:
-        """Get average test coverage"""
-        # Placeholder - implement with your CI system
-        return None
+        """Get bugs created in the period (from JIRA/Linear export files)"""
+        # Exports are fleet-wide, so only shard 0 reports them
+        index = self._get_issue_index() if self.shard_index == 0 else None
+        if index is None:
+            return 0
+        return index.bug_totals(self.since_date.strftime("%Y-%m-%d"))[0]
+
+    def _get_bug_reopen_totals(self) -> tuple[int, int]:
+        """Get (reopened bugs, resolved bugs) in the period (from JIRA/Linear export files)"""
+        index = self._get_issue_index() if self.shard_index == 0 else None
+        if index is None:
+            return 0, 0
+        _, reopened, resolved = index.bug_totals(self.since_date.strftime("%Y-%m-%d"))
+        return reopened, resolved
+
+    def _get_test_coverage_totals(self) -> tuple[int, int]:
+        """Get (covered lines, total lines) across repos from coverage reports.
+
+        Reports are cached by path, size and mtime, so an unchanged
+        multi-hundred-MB report is parsed only once.
+        """
+        cache_file = os.path.join(self.cache_dir, "coverage.json") if self.cache_dir else None
+        cache = self._load_json_cache(cache_file) or {}
+        fresh_cache = {}
+        covered = 0
+        total = 0
+
+        for i, repo_path in enumerate(self.repo_paths):
+            if self._out_of_time("coverage", i, len(self.repo_paths)):
+                break
+            for report in find_coverage_reports(repo_path, self.coverage_patterns):
+                try:
+                    st = os.stat(report)
+                except OSError:
+                    continue
+
+                key = os.path.abspath(report)
+                entry = cache.get(key)
+                if not entry or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+                    result = parse_coverage_file(report, self._budget.expired)
+                    if result is None:
+                        if self._budget.expired():
+                            self._mark("coverage", PARTIAL, f"deadline reached while parsing {report}")
+                        continue
+                    entry = {"size": st.st_size, "mtime": st.st_mtime, "covered": result[0], "total": result[1]}
+
+                fresh_cache[key] = entry
+                covered += entry["covered"]
+                total += entry["total"]
+
+        if not fresh_cache and "coverage" not in self._source_status:
+            self._mark("coverage", MISSING, "no coverage reports found")
+
+        if fresh_cache != cache:
+            # Keep entries for repos outside this run (other shards, other teams)
+            self._save_json_cache(cache_file, {**cache, **fresh_cache})
+
+        return covered, total
 
     # =========================================================================
     # Helper Methods - Files
     # =========================================================================
 
-    def _count_files(self, directory: Path, exclude: list[str] = None) -> int:
-        """Count files in directory"""
-        if not directory.exists():
-            return 0
+    def _cache_key(self, repo_path: str) -> str:
+        """Stable per-repo cache file stem"""
+        return hashlib.sha1(os.path.abspath(repo_path).encode()).hexdigest()[:16]
 
-        exclude = exclude or [".gitkeep"]
-        count = 0
+    def _developer_cache_file(self, repo_path: str) -> Optional[str]:
+        """Cache file for a repo's per-day developer counters"""
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, "developers", f"{self._cache_key(repo_path)}.json")
 
-        for f in directory.iterdir():
-            if f.is_file() and f.name not in exclude:
-                count += 1
+    def _load_json_cache(self, path: Optional[str]) -> Optional[dict]:
+        """Load a JSON cache file, treating any problem as a cache miss"""
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-        return count
+    def _save_json_cache(self, path: Optional[str], data: dict) -> None:
+        """Atomically write a JSON cache file (best effort)"""
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _get_inventory(self, repo_path: str, source: str = "knowledge") -> ClaudeInventory:
+        """Get the cached .claude/ inventory for a repo, scanning it once.
+
+        A scan cut short by the stage budget is marked against `source` and
+        not cached, so a later stage with time left rescans the repo.
+        """
+        inventory = self._inventories.get(repo_path)
+        if inventory is None:
+            inventory = scan_claude_dir(repo_path, self._budget.expired)
+            if inventory.truncated:
+                repo = os.path.basename(os.path.abspath(repo_path))
+                self._mark(source, PARTIAL, f"deadline reached while scanning .claude/ in {repo}")
+            else:
+                self._inventories[repo_path] = inventory
+        return inventory
 
     def _count_pattern_references(self, repo_path: str) -> int:
         """Count references to patterns in code"""
-        patterns_dir = Path(repo_path) / ".claude" / "patterns"
-        if not patterns_dir.exists():
-            return 0
-
-        # Get pattern names
-        pattern_names = []
-        for f in patterns_dir.glob("*.md"):
-            if f.name not in ["TEMPLATE.md", ".gitkeep"]:
-                # Extract pattern name from file
-                pattern_names.append(f.stem)
+        pattern_names = [
+            f.name[:-3]
+            for f in self._get_inventory(repo_path).files("patterns")
+            if f.name.endswith(".md")
+        ]
 
         if not pattern_names:
             return 0
 
         # Search for references in code
         total_refs = 0
+        repo = os.path.basename(os.path.abspath(repo_path))
         for pattern in pattern_names:
             try:
                 result = subprocess.run(
@@ -430,9 +2077,16 @@ class MetricsCollector:
                     cwd=repo_path,
                     capture_output=True,
                     text=True,
+                    timeout=self._budget.timeout(),
                 )
                 if result.returncode == 0:
-                    total_refs += len(result.stdout.strip().split("\n"))
+                    files = result.stdout.strip().split("\n")
+                    total_refs += len(files)
+                    for file in files:
+                        self._emit("pattern_hit", repo=repo, pattern=pattern, file=file)
+            except subprocess.TimeoutExpired:
+                self._mark("pattern_references", PARTIAL, f"pattern search timed out in {repo}")
+                break
             except Exception:
                 pass
 
@@ -443,47 +2097,91 @@ class MetricsCollector:
     # =========================================================================
 
     def _parse_hook_logs(self) -> dict:
-        """Parse pre-commit hook logs"""
-        log_path = Path(self.hook_log_path)
-        if not log_path.exists():
-            return {
-                "secrets": 0,
-                "pii": 0,
-                "pii_exposed": 0,
-                "dangerous_files": 0,
-                "antipatterns": 0,
-            }
-
-        counts = {
-            "secrets": 0,
-            "pii": 0,
-            "pii_exposed": 0,
-            "dangerous_files": 0,
-            "antipatterns": 0,
-        }
+        """Aggregate pre-commit hook events in the period from the log index"""
+        counts = dict.fromkeys(HOOK_COUNT_KEYS, 0)
+        since_day = self.since_date.strftime("%Y-%m-%d")
+
+        if not os.path.exists(self.hook_log_path):
+            self._mark("hook_log", MISSING, f"hook log not found: {self.hook_log_path}")
+        index = self._get_hook_index()
+        if self.events is None:
+            by_code = index.counts(since_day)
+        else:
+            by_code = {}
+            for codes in self._stream_hook_events(index, since_day).values():
+                for code, n in codes.items():
+                    by_code[code] = by_code.get(code, 0) + n
+        for code, n in by_code.items():
+            for key in HOOK_EVENT_COUNTERS.get(code, ()):
+                counts[key] += n
 
-        try:
-            with open(log_path) as f:
-                for line in f:
-                    if not line.strip():
-                        continue
+        return counts
 
-                    # Expected format: timestamp,user,event_type
-                    parts = line.strip().split(",")
-                    if len(parts) >= 3:
-                        event_type = parts[2].upper()
-                        if "SECRET" in event_type:
-                            counts["secrets"] += 1
-                        elif "PII" in event_type:
-                            counts["pii"] += 1
-                        elif "DANGEROUS" in event_type:
-                            counts["dangerous_files"] += 1
-                        elif "ANTIPATTERN" in event_type:
-                            counts["antipatterns"] += 1
-        except Exception:
-            pass
+    def _stream_hook_events(
+        self, index: HookLogIndex, since_day: str, include: Optional[Callable[[str], bool]] = None
+    ) -> dict[str, dict[str, int]]:
+        """Export hook events for days >= since_day and count them by day and code.
+
+        With --events the aggregates are tallied from the same record stream
+        the events are written from, so the log is read once.
+        """
+        daily: dict[str, dict[str, int]] = {}
+        for record in index.iter_records(since_day):
+            if include is not None and not include(record["day"]):
+                continue
+            codes = daily.setdefault(record["day"], {})
+            codes[record["code"]] = codes.get(record["code"], 0) + 1
+            categories = HOOK_EVENT_COUNTERS.get(record["code"], ())
+            self._emit(
+                "hook_event",
+                timestamp=record["ts"],
+                user=record["user"],
+                repo=record["repo"],
+                event_type=record["code"],
+                category=categories[0] if categories else None,
+                file=record["file"],
+            )
+        return daily
 
-        return counts
+    def _get_hook_index(self) -> HookLogIndex:
+        """Update the hook log index within the stage budget"""
+        index = HookLogIndex(self.hook_log_path).update(self._budget.expired)
+        if index.stopped:
+            self._mark("hook_log", PARTIAL, "deadline reached while indexing the hook log")
+        return index
+
+
+def format_percentiles(productivity: ProductivityMetrics, name: str) -> str:
+    """"p50 / p90 / p99" for a per-developer distribution, "-" when empty"""
+    values = [getattr(productivity, f"{name}_{p}") for p in ("p50", "p90", "p99")]
+    if all(v is None for v in values):
+        return "-"
+    return " / ".join("-" if v is None else f"{v:.1f}" for v in values)
+
+
+def format_anomalies(metrics: AllMetrics) -> str:
+    """Markdown section listing statistically significant changes"""
+    significant = [(name, score) for name, score in metrics.anomalies.items() if score["significant"]]
+    if not significant:
+        return ""
+
+    lines = ["", "## Significant Changes", "", "| Metric | Value | Expected | z | |", "|--------|-------|----------|---|---|"]
+    for name, score in significant:
+        marker = "🟢" if score["is_improvement"] else "🔴"
+        lines.append(f"| {name} | {score['value']:g} | {score['expected']:g} | {score['z']:+.1f} | {marker} |")
+    return "\n".join(lines) + "\n"
+
+
+def format_completeness(metrics: AllMetrics) -> str:
+    """Markdown section listing fields that are not complete"""
+    incomplete = [(name, status) for name, status in metrics.field_status.items() if status["status"] != COMPLETE]
+    if not incomplete:
+        return ""
+
+    lines = ["", "## Data Completeness", "", "| Field | Status | Reason |", "|-------|--------|--------|"]
+    for name, status in incomplete:
+        lines.append(f"| {name} | {status['status']} | {'; '.join(status['reasons'])} |")
+    return "\n".join(lines) + "\n"
 
 
 def format_output(metrics: AllMetrics, format: str) -> str:
@@ -513,6 +2211,8 @@ def format_output(metrics: AllMetrics, format: str) -> str:
 | PR Cycle Time | {metrics.productivity.pr_cycle_time_hours} hours |
 | PRs/Dev/Week | {metrics.productivity.prs_per_dev_per_week:.1f} |
 | Commits/Dev/Week | {metrics.productivity.commits_per_dev_per_week:.1f} |
+| Commits/Dev/Week p50 / p90 / p99 | {format_percentiles(metrics.productivity, "commits_per_dev_per_week")} |
+| PRs/Dev/Week p50 / p90 / p99 | {format_percentiles(metrics.productivity, "prs_per_dev_per_week")} |
 | Active Developers | {metrics.productivity.active_developers}/{metrics.productivity.total_developers} |
 
 ## Quality
@@ -523,6 +2223,7 @@ def format_output(metrics: AllMetrics, format: str) -> str:
 | PII Patterns Detected | {metrics.quality.pii_patterns_detected} |
 | Bug Count | {metrics.quality.bug_count} |
 | Bug Reopen Rate | {metrics.quality.bug_reopen_rate}% |
+| Test Coverage | {"-" if metrics.quality.test_coverage_avg is None else f"{metrics.quality.test_coverage_avg}%"} |
 
 ## Knowledge Flywheel
 
@@ -533,6 +2234,11 @@ def format_output(metrics: AllMetrics, format: str) -> str:
 | Failures Documented | {metrics.knowledge.failures_documented} |
 | Pattern References | {metrics.knowledge.pattern_references} |
 | Avg Reuse/Pattern | {metrics.knowledge.avg_reuse_per_pattern}x |
+| Learnings Added | {metrics.knowledge.learnings_added} ({metrics.knowledge.learnings_per_month}/month) |
+| Patterns Added / Promoted | {metrics.knowledge.patterns_added} / {metrics.knowledge.patterns_promoted} |
+| Failures Added | {metrics.knowledge.failures_added} |
+| Knowledge Removed | {metrics.knowledge.knowledge_removed} |
+| Search Index | {metrics.knowledge.indexed_documents} docs, {metrics.knowledge.indexed_terms} terms, {metrics.knowledge.stale_documents} stale |
 
 ## Compliance
 
@@ -541,7 +2247,7 @@ def format_output(metrics: AllMetrics, format: str) -> str:
 | Secrets Blocked | {metrics.compliance.secrets_blocked} |
 | PII Exposure Events | {metrics.compliance.pii_exposure_events} |
 | Dangerous Files Blocked | {metrics.compliance.dangerous_files_blocked} |
-"""
+{format_anomalies(metrics)}{format_completeness(metrics)}"""
 
     else:  # csv
         lines = ["metric,value"]
@@ -557,27 +2263,168 @@ def format_output(metrics: AllMetrics, format: str) -> str:
         return "\n".join(lines)
 
 
+def render_output(
+    partial: PartialMetrics,
+    format: str,
+    detector: Optional[AnomalyDetector] = None,
+    events: Optional[EventWriter] = None,
+) -> str:
+    """Render a partial result as-is or as finalized metrics.
+
+    With a detector, the finalized snapshot is scored against (and folded
+    into) the anomaly state; significant changes are also emitted as
+    "alert" events.
+    """
+    if format == "partial":
+        return json.dumps(partial.to_dict(), indent=2)
+
+    metrics = partial.finalize()
+    if detector is not None:
+        metrics.anomalies = detector.observe(asdict(metrics))
+        if events is not None:
+            for metric, score in metrics.anomalies.items():
+                if score["significant"]:
+                    events.emit("alert", metric=metric, period_end=metrics.period_end, **score)
+    return format_output(metrics, format)
+
+
+def parse_backfill_range(value: str) -> tuple[date, date]:
+    """Parse START..END, where each end is YYYY-MM (whole month) or YYYY-MM-DD"""
+    start, sep, end = value.partition("..")
+    try:
+        if not sep:
+            raise ValueError
+        start_date = date.fromisoformat(start if len(start) > 7 else f"{start}-01")
+        if len(end) > 7:
+            end_date = date.fromisoformat(end)
+        else:
+            month_start = date.fromisoformat(f"{end}-01")
+            end_date = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    except ValueError:
+        raise argparse.ArgumentTypeError("backfill range must look like 2024-01..2025-12 or 2024-01-15..2024-03-31")
+    if end_date < start_date:
+        raise argparse.ArgumentTypeError("backfill range ends before it starts")
+    return start_date, end_date
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse an I/N shard spec"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like I/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must satisfy 0 <= I < N")
+    return index, count
+
+
 def main():
     parser = argparse.ArgumentParser(description="Collect Claude Code metrics")
     parser.add_argument("--baseline", action="store_true", help="Collect baseline metrics")
     parser.add_argument("--months", type=int, default=1, help="Months of history to analyze")
-    parser.add_argument("--output", choices=["json", "csv", "markdown"], default="json")
+    parser.add_argument("--output", choices=["json", "csv", "markdown", "partial"],
+                        help="Output format (default: json, or partial with --shard)")
     parser.add_argument("--repos", nargs="+", help="Repository paths to analyze")
     parser.add_argument("--save", type=str, help="Save output to file")
+    parser.add_argument("--distinct-mode", choices=["exact", "hll"], default="exact",
+                        help="Developer counting: exact sets or HyperLogLog sketches (large fleets)")
+    parser.add_argument("--hll-error", type=float, default=0.01,
+                        help="Target relative error for --distinct-mode=hll")
+    parser.add_argument("--cache-dir", type=str, default="~/.claude-metrics/cache",
+                        help="Directory for incremental per-repo caches")
+    parser.add_argument("--no-cache", action="store_true", help="Disable on-disk caches")
+    parser.add_argument("--shard", type=parse_shard,
+                        help="Collect only shard I of N (e.g. 0/4) and emit a partial result")
+    parser.add_argument("--issue-exports", type=str,
+                        help="Directory of JIRA/Linear CSV or JSON exports for bug metrics "
+                             "(default: $ISSUE_EXPORT_DIR)")
+    parser.add_argument("--hook-log", type=str,
+                        help="Pre-commit hook event log (default: $CLAUDE_METRICS_HOOK_LOG or "
+                             "~/.claude-metrics/blocks.log)")
+    parser.add_argument("--deadline", type=float,
+                        help="Time budget in seconds; slow sources are cut off and reported as "
+                             "partial/missing instead of blocking the run")
+    parser.add_argument("--backfill", type=parse_backfill_range,
+                        help="Write one snapshot per period for START..END (YYYY-MM or YYYY-MM-DD), "
+                             "reading each source once; --save names the output directory")
+    parser.add_argument("--bucket", choices=["month", "week"], default="month",
+                        help="Period size for --backfill")
+    parser.add_argument("--events", type=str,
+                        help="Also stream raw events (commits, PRs, hook events, pattern hits, "
+                             "anomaly alerts) to this NDJSON file; a .gz suffix enables gzip")
+    parser.add_argument("--anomaly-state", type=str,
+                        help=f"EWMA anomaly state file (default: {STATE_FILE} next to --save)")
+    parser.add_argument("--no-anomalies", action="store_true", help="Skip anomaly scoring")
+
+    subparsers = parser.add_subparsers(dest="command")
+    merge_parser = subparsers.add_parser("merge", help="Merge partial results from sharded runs")
+    merge_parser.add_argument("partials", nargs="+", help="Partial result JSON files")
+    merge_parser.add_argument("--output", choices=["json", "csv", "markdown", "partial"], default="json")
+    merge_parser.add_argument("--save", type=str, help="Save output to file")
+    merge_parser.add_argument("--anomaly-state", type=str,
+                              help=f"EWMA anomaly state file (default: {STATE_FILE} next to --save)")
+    merge_parser.add_argument("--no-anomalies", action="store_true", help="Skip anomaly scoring")
 
     args = parser.parse_args()
+    output_format = args.output or ("partial" if args.shard else "json")
+    backfill = args.command != "merge" and args.backfill
+
+    # Anomaly state lives next to saved snapshots unless pointed elsewhere
+    detector = None
+    state_path = args.anomaly_state
+    if state_path is None and args.save and not args.no_anomalies:
+        state_path = os.path.join(args.save, STATE_FILE) if backfill else default_state_path(args.save)
+    if state_path and output_format != "partial":
+        detector = AnomalyDetector.load(state_path)
+
+    events = EventWriter(args.events) if args.command != "merge" and args.events else None
+    try:
+        if args.command == "merge":
+            try:
+                partials = {None: merge_partials(args.partials)}
+            except (OSError, ValueError) as e:
+                parser.error(f"cannot merge partial results: {e}")
+        else:
+            # Default to current directory if no repos specified
+            repo_paths = args.repos or [os.getcwd()]
+            collector = MetricsCollector(
+                repo_paths=repo_paths,
+                months=args.months,
+                distinct_mode=args.distinct_mode,
+                hll_error=args.hll_error,
+                cache_dir=None if args.no_cache else args.cache_dir,
+                shard=args.shard,
+                events=events,
+                hook_log_path=args.hook_log,
+                issue_export_dir=args.issue_exports,
+                deadline=args.deadline,
+            )
 
-    # Default to current directory if no repos specified
-    repo_paths = args.repos or [os.getcwd()]
-
-    collector = MetricsCollector(
-        repo_paths=repo_paths,
-        months=args.months,
-    )
-
-    metrics = collector.collect_all(is_baseline=args.baseline)
-    output = format_output(metrics, args.output)
-
+            if backfill:
+                partials = collector.collect_backfill(*args.backfill, bucket=args.bucket, is_baseline=args.baseline)
+            else:
+                partials = {None: collector.collect_partial(is_baseline=args.baseline)}
+
+        # Periods are rendered oldest first so the anomaly state advances in order
+        outputs = {key: render_output(partial, output_format, detector, events) for key, partial in partials.items()}
+    finally:
+        if events is not None:
+            events.close()
+
+    if detector is not None:
+        detector.save(state_path)
+
+    if backfill:
+        out_dir = args.save or "backfill"
+        os.makedirs(out_dir, exist_ok=True)
+        extension = {"markdown": "md", "csv": "csv"}.get(output_format, "json")
+        for key, output in outputs.items():
+            with open(os.path.join(out_dir, f"metrics_{key}.{extension}"), "w") as f:
+                f.write(output)
+        print(f"{len(outputs)} {args.bucket}ly snapshots saved to {out_dir}")
+        return
+
+    output = outputs[None]
     if args.save:
         with open(args.save, "w") as f:
             f.write(output)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Coverage Report Parsing
+
+Streaming parsers for the coverage artifacts collect_metrics.py looks for in
+each repository. Every parser returns (covered_lines, total_lines) and keeps
+memory flat regardless of report size:
+
+- Cobertura XML:    iterparse; stops at the root element when it carries
+                    lines-covered/lines-valid totals, otherwise counts class
+                    lines and detaches each class once it is finished
+- lcov .info:       line streaming over LH:/LF: records
+- coverage.py JSON: reads only the tail of the file, where "totals" lives
+"""
+
+import glob
+import json
+import os
+import xml.etree.ElementTree as ET
+from typing import Callable, Optional
+
+# Searched in order; the first pattern that matches anything in a repo wins,
+# so the same code is never counted twice from two report formats.
+COVERAGE_PATTERNS = (
+    "coverage.xml",
+    "cobertura.xml",
+    "coverage/cobertura-coverage.xml",
+    "target/site/cobertura/coverage.xml",
+    "build/reports/cobertura/coverage.xml",
+    "lcov.info",
+    "coverage/lcov.info",
+    "packages/*/coverage/lcov.info",
+    "coverage.json",
+)
+
+JSON_TAIL_BYTES = 1 << 20
+# XML events / lcov lines between checks of a caller's should_stop()
+STOP_CHECK_EVERY = 10_000
+
+
+def parse_cobertura(path: str, should_stop: Optional[Callable[[], bool]] = None) -> Optional[tuple[int, int]]:
+    """Parse a Cobertura XML report (None if unreadable or stopped early).
+
+    Without root totals, only <line> elements directly under a class's
+    <lines> are counted; the copies under <methods><method><lines> would
+    count method lines twice.
+    """
+    covered = 0
+    total = 0
+    stack: list[ET.Element] = []
+
+    try:
+        for i, (event, elem) in enumerate(ET.iterparse(path, events=("start", "end")), 1):
+            if should_stop and i % STOP_CHECK_EVERY == 0 and should_stop():
+                return None
+            if event == "start":
+                if not stack:
+                    valid = elem.get("lines-valid")
+                    hit = elem.get("lines-covered")
+                    if valid is not None and hit is not None:
+                        return int(hit), int(valid)
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            if elem.tag == "line":
+                if len(stack) >= 2 and stack[-1].tag == "lines" and stack[-2].tag == "class":
+                    total += 1
+                    if int(elem.get("hits", "0")) > 0:
+                        covered += 1
+            elif elem.tag == "class" and stack:
+                # Detach finished classes so memory does not grow with the report
+                stack[-1].remove(elem)
+    except (ET.ParseError, OSError, ValueError):
+        return None
+
+    return covered, total
+
+
+def parse_lcov(path: str, should_stop: Optional[Callable[[], bool]] = None) -> Optional[tuple[int, int]]:
+    """Parse an lcov tracefile (None if unreadable or stopped early)"""
+    covered = 0
+    total = 0
+
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for i, line in enumerate(f, 1):
+                if should_stop and i % STOP_CHECK_EVERY == 0 and should_stop():
+                    return None
+                if line.startswith("LH:"):
+                    covered += int(line[3:])
+                elif line.startswith("LF:"):
+                    total += int(line[3:])
+    except (OSError, ValueError):
+        return None
+
+    return covered, total
+
+
+def parse_coverage_py_json(path: str) -> Optional[tuple[int, int]]:
+    """Parse a coverage.py JSON report from its trailing "totals" object"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - JSON_TAIL_BYTES))
+            tail = f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+
+    key = tail.rfind('"totals"')
+    if key == -1:
+        return None
+    start = tail.find("{", key)
+    try:
+        totals, _ = json.JSONDecoder().raw_decode(tail, start)
+        return int(totals["covered_lines"]), int(totals["num_statements"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def parse_coverage_file(path: str, should_stop: Optional[Callable[[], bool]] = None) -> Optional[tuple[int, int]]:
+    """Parse a coverage report, choosing the parser from the file name.
+
+    `should_stop` is polled while streaming large XML/lcov reports; the
+    coverage.py parser only reads a bounded tail and ignores it.
+    """
+    if path.endswith(".xml"):
+        return parse_cobertura(path, should_stop)
+    elif path.endswith(".info"):
+        return parse_lcov(path, should_stop)
+    elif path.endswith(".json"):
+        return parse_coverage_py_json(path)
+    return None
+
+
+def find_coverage_reports(repo_path: str, patterns: tuple[str, ...] = COVERAGE_PATTERNS) -> list[str]:
+    """Coverage reports for a repo from the first matching pattern"""
+    for pattern in patterns:
+        matches = sorted(p for p in glob.glob(os.path.join(repo_path, pattern)) if os.path.isfile(p))
+        if matches:
+            return matches
+    return []
@@ -12,15 +12,46 @@ Usage:
     python generate_report.py --compare baseline.json  # Compare to baseline
     python generate_report.py --format html            # Output format
     python generate_report.py --send-email             # Email report to stakeholders
+    python generate_report.py --dashboard site/        # Publish static dashboard bundle
+    python generate_report.py --batch reports.json     # Render many jobs in parallel
 """
 
 import argparse
+import hashlib
 import json
 import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+
+from anomalies import LOWER_IS_BETTER
+
+# Projects per lazily loaded dashboard shard
+DASHBOARD_SHARD_SIZE = 100
+HASHED_FILE_RE = re.compile(r"^(summary|projects)\.[0-9a-f]{16}\.json$")
+
+FORMAT_EXTENSIONS = {"markdown": "md", "html": "html", "json": "json"}
+
+# ROI estimate assumptions (shared by the report and the dashboard bundle)
+ROI_HOURS_SAVED_PER_DEV_WEEK = 4
+ROI_HOURLY_RATE = 75
+
+
+def roi_estimate(active_developers: int) -> dict:
+    """Monthly hours and value saved under the ROI assumptions"""
+    monthly_hours = active_developers * ROI_HOURS_SAVED_PER_DEV_WEEK * 4
+    return {
+        "active_developers": active_developers,
+        "hours_saved_per_dev_per_week": ROI_HOURS_SAVED_PER_DEV_WEEK,
+        "hourly_rate": ROI_HOURLY_RATE,
+        "monthly_hours": monthly_hours,
+        "monthly_value": monthly_hours * ROI_HOURLY_RATE,
+    }
 
 
 @dataclass
@@ -48,6 +79,15 @@ class ReportGenerator:
         self.baseline = self._load_metrics(baseline_metrics_path) if baseline_metrics_path else None
         self.previous = self._load_metrics(previous_metrics_path) if previous_metrics_path else None
 
+    @classmethod
+    def from_snapshots(
+        cls, current: dict, baseline: Optional[dict] = None, previous: Optional[dict] = None
+    ) -> "ReportGenerator":
+        """Build a generator from already loaded snapshots"""
+        generator = cls.__new__(cls)
+        generator.current, generator.baseline, generator.previous = current, baseline, previous
+        return generator
+
     def _load_metrics(self, path: str) -> dict:
         """Load metrics from JSON file"""
         with open(path) as f:
@@ -68,15 +108,6 @@ class ReportGenerator:
         """Calculate deltas between current and comparison metrics"""
         deltas = []
 
-        # Define which metrics should decrease for improvement
-        lower_is_better = {
-            "pr_cycle_time_hours",
-            "avg_review_iterations",
-            "bug_count",
-            "bug_reopen_rate",
-            "pii_exposure_events",
-        }
-
         categories = [
             ("productivity", self.current.get("productivity", {}), compare_to.get("productivity", {})),
             ("quality", self.current.get("quality", {}), compare_to.get("quality", {})),
@@ -98,7 +129,7 @@ class ReportGenerator:
                 delta_pct = (delta / prev_val) * 100 if prev_val else 0
 
                 # Determine if change is improvement
-                if key in lower_is_better:
+                if key in LOWER_IS_BETTER:
                     is_improvement = delta < 0
                 else:
                     is_improvement = delta > 0
@@ -143,12 +174,22 @@ class ReportGenerator:
         know = self.current.get("knowledge", {})
         adopt = self.current.get("adoption", {})
 
-        lines.extend([
-            "### Key Metrics",
-            "",
-            "| Metric | Current | vs Baseline |",
-            "|--------|---------|-------------|",
-        ])
+        # EWMA significance gets its own column, separate from the baseline delta
+        has_trend = bool(self.current.get("anomalies"))
+        if has_trend:
+            lines.extend([
+                "### Key Metrics",
+                "",
+                "| Metric | Current | vs Baseline | vs Trend |",
+                "|--------|---------|-------------|----------|",
+            ])
+        else:
+            lines.extend([
+                "### Key Metrics",
+                "",
+                "| Metric | Current | vs Baseline |",
+                "|--------|---------|-------------|",
+            ])
 
         # Add key metrics with deltas
         key_metrics = [
@@ -168,7 +209,23 @@ class ReportGenerator:
                         color = "🟢" if d.is_improvement else "🔴"
                         delta_str = f"{color} {arrow}{abs(d.delta_percent)}%"
                         break
-            lines.append(f"| {label} | {current_val} | {delta_str} |")
+            if has_trend:
+                lines.append(f"| {label} | {current_val} | {delta_str} | {self._trend_str(category, key)} |")
+            else:
+                lines.append(f"| {label} | {current_val} | {delta_str} |")
+
+        significant = self._significant_changes()
+        if significant:
+            lines.extend([
+                "",
+                "### Significant Changes",
+                "",
+                "| Metric | Current | Expected | z-score |",
+                "|--------|---------|----------|---------|",
+            ])
+            for metric, score in significant:
+                marker = "🟢" if score["is_improvement"] else "🔴"
+                lines.append(f"| {marker} {metric} | {score['value']:g} | {score['expected']:g} | {score['z']:+.1f} |")
 
         lines.extend([
             "",
@@ -191,10 +248,17 @@ class ReportGenerator:
             ("prs_per_dev_per_week", "PRs/Dev/Week"),
             ("commits_per_dev_per_week", "Commits/Dev/Week"),
             ("avg_review_iterations", "Avg Review Iterations"),
+            ("commits_per_dev_per_week_p50", "Commits/Dev/Week (p50)"),
+            ("commits_per_dev_per_week_p90", "Commits/Dev/Week (p90)"),
+            ("commits_per_dev_per_week_p99", "Commits/Dev/Week (p99)"),
+            ("prs_per_dev_per_week_p50", "PRs/Dev/Week (p50)"),
+            ("prs_per_dev_per_week_p90", "PRs/Dev/Week (p90)"),
+            ("prs_per_dev_per_week_p99", "PRs/Dev/Week (p99)"),
         ]:
             val = prod.get(key, 0)
+            val = "-" if val is None else f"{val:.1f}"
             delta_str = self._get_delta_str(vs_baseline, "productivity", key)
-            lines.append(f"| {label} | {val:.1f} | {delta_str} |")
+            lines.append(f"| {label} | {val} | {delta_str} |")
 
         # Quality section
         lines.extend([
@@ -210,8 +274,11 @@ class ReportGenerator:
             ("pii_patterns_detected", "PII Patterns Detected"),
             ("bug_count", "Bug Count"),
             ("bug_reopen_rate", "Bug Reopen Rate (%)"),
+            ("test_coverage_avg", "Test Coverage (%)"),
         ]:
             val = qual.get(key, 0)
+            if val is None:
+                val = "-"
             delta_str = self._get_delta_str(vs_baseline, "quality", key)
             lines.append(f"| {label} | {val} | {delta_str} |")
 
@@ -226,10 +293,15 @@ class ReportGenerator:
 
         for key, label in [
             ("learnings_count", "Learnings Captured"),
+            ("learnings_added", "Learnings Added (period)"),
+            ("learnings_per_month", "Learnings/Month"),
             ("patterns_count", "Patterns Created"),
+            ("patterns_promoted", "Patterns Promoted (period)"),
             ("failures_documented", "Failures Documented"),
             ("pattern_references", "Pattern References"),
             ("avg_reuse_per_pattern", "Avg Reuse/Pattern"),
+            ("indexed_documents", "Searchable Documents"),
+            ("stale_documents", "Unindexed/Stale Documents"),
         ]:
             val = know.get(key, 0)
             delta_str = self._get_delta_str(vs_baseline, "knowledge", key)
@@ -251,6 +323,22 @@ class ReportGenerator:
         lines.append(f"| Secrets Blocked | {comp.get('secrets_blocked', 0)} | ✅ Prevented |")
         lines.append(f"| Dangerous Files Blocked | {comp.get('dangerous_files_blocked', 0)} | ✅ Prevented |")
 
+        # Fields the collector could not fully gather (e.g. --deadline reached)
+        incomplete = [
+            (name, status) for name, status in self.current.get("field_status", {}).items()
+            if status.get("status") != "complete"
+        ]
+        if incomplete:
+            lines.extend([
+                "",
+                "### Data Completeness",
+                "",
+                "| Field | Status | Reason |",
+                "|-------|--------|--------|",
+            ])
+            for name, status in incomplete:
+                lines.append(f"| {name} | {status['status']} | {'; '.join(status.get('reasons', []))} |")
+
         # ROI estimate
         lines.extend([
             "",
@@ -260,21 +348,16 @@ class ReportGenerator:
             "",
         ])
 
-        active_devs = prod.get("active_developers", 0)
-        hours_saved_per_dev = 4  # Configurable assumption
-        hourly_rate = 75  # Configurable
-
-        monthly_hours = active_devs * hours_saved_per_dev * 4
-        monthly_value = monthly_hours * hourly_rate
+        roi = roi_estimate(prod.get("active_developers", 0))
 
         lines.extend([
             f"**Assumptions:**",
-            f"- Active developers: {active_devs}",
-            f"- Hours saved per dev per week: {hours_saved_per_dev}",
-            f"- Average hourly rate: ${hourly_rate}",
+            f"- Active developers: {roi['active_developers']}",
+            f"- Hours saved per dev per week: {roi['hours_saved_per_dev_per_week']}",
+            f"- Average hourly rate: ${roi['hourly_rate']}",
             "",
-            f"**Estimated Monthly Value:** ${monthly_value:,.0f}",
-            f"- Hours saved: {monthly_hours} hours/month",
+            f"**Estimated Monthly Value:** ${roi['monthly_value']:,.0f}",
+            f"- Hours saved: {roi['monthly_hours']} hours/month",
             "",
         ])
 
@@ -292,8 +375,8 @@ class ReportGenerator:
         if adopt.get("adoption_percentage", 0) < 80:
             recommendations.append("- 📈 **Increase Adoption**: Schedule training sessions for non-active developers")
 
-        # Check flywheel
-        if know.get("learnings_count", 0) < 10:
+        # Check flywheel (+10 learnings/month; older snapshots only have the total)
+        if know.get("learnings_per_month", know.get("learnings_count", 0)) < 10:
             recommendations.append("- 📚 **Activate Flywheel**: Remind team to use `/learn` after discoveries")
 
         if know.get("patterns_count", 0) > 0 and know.get("avg_reuse_per_pattern", 0) < 2:
@@ -303,6 +386,13 @@ class ReportGenerator:
         if comp.get("pii_exposure_events", 0) > 0:
             recommendations.append("- 🚨 **Address PII Events**: Review and remediate PII exposure incidents")
 
+        # Check for statistically unusual regressions
+        for metric, score in significant:
+            if not score["is_improvement"]:
+                recommendations.append(
+                    f"- 🔎 **Investigate {metric}**: {score['value']:g} vs expected {score['expected']:g}"
+                )
+
         if not recommendations:
             recommendations.append("- ✅ All metrics healthy - continue current practices")
 
@@ -324,13 +414,27 @@ class ReportGenerator:
 
         for d in deltas:
             if d.category == category and d.name == key:
-                arrow = "↓" if d.delta < 0 else "↑"
                 sign = "+" if d.delta > 0 else ""
                 emoji = "🟢" if d.is_improvement else ("🔴" if not d.is_improvement and abs(d.delta_percent) > 10 else "⚪")
                 return f"{emoji} {sign}{d.delta_percent}%"
 
         return "-"
 
+    def _significant_changes(self) -> list[tuple[str, dict]]:
+        """Metrics the collector's anomaly detector flagged for the current snapshot"""
+        anomalies = self.current.get("anomalies", {})
+        return [(metric, score) for metric, score in anomalies.items() if score.get("significant")]
+
+    def _trend_str(self, category: Optional[str], key: Optional[str]) -> str:
+        """How the current value compares with the collector's EWMA expectation"""
+        score = self.current.get("anomalies", {}).get(f"{category}.{key}") if category and key else None
+        if not score or score.get("z") is None:
+            return "-"
+        if not score.get("significant"):
+            return "normal"
+        marker = "🟢" if score["is_improvement"] else "🔴"
+        return f"{marker} unusual (z {score['z']:+.1f})"
+
     def _generate_html(self) -> str:
         """Generate HTML report with styling"""
         markdown_content = self._generate_markdown()
@@ -407,6 +511,222 @@ class ReportGenerator:
 
         return json.dumps(report, indent=2)
 
+    # =========================================================================
+    # Dashboard Bundle
+    # =========================================================================
+
+    def publish_dashboard(self, out_dir: str, shard_size: int = DASHBOARD_SHARD_SIZE) -> str:
+        """Write a static dashboard bundle and return the manifest path.
+
+        Layout (every file but manifest.json and index.html is immutable):
+
+            manifest.json               -> names the current summary (short cache)
+            summary.<hash>.json         -> headline metrics, deltas, ROI, shard list
+            projects.<hash>.json        -> `shard_size` project rows each
+            index.html                  -> dashboard.html, fetches the above
+
+        Paths are relative, so any static file host can serve the bundle.
+        Hashed files referenced by the previous manifest are kept for pages
+        still open on the old summary; older ones are pruned.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        manifest_path = os.path.join(out_dir, "manifest.json")
+        previous_files = set()
+        try:
+            with open(manifest_path) as f:
+                previous_files = set(json.load(f).get("files", []))
+        except (OSError, ValueError):
+            pass
+
+        projects = self.current.get("projects", [])
+        shards = []
+        for start in range(0, len(projects), shard_size):
+            rows = projects[start:start + shard_size]
+            shards.append({
+                "file": self._write_hashed(out_dir, "projects", {"projects": rows}),
+                "count": len(rows),
+                "first": rows[0]["name"],
+                "last": rows[-1]["name"],
+            })
+
+        vs_baseline = self._calculate_deltas(self.baseline) if self.baseline else []
+        vs_previous = self._calculate_deltas(self.previous) if self.previous else []
+        summary = {
+            "generated_at": datetime.now().isoformat(),
+            "current": {key: value for key, value in self.current.items() if key != "projects"},
+            "vs_baseline": [asdict(d) for d in vs_baseline],
+            "vs_previous": [asdict(d) for d in vs_previous],
+            "roi": roi_estimate(self.current.get("productivity", {}).get("active_developers", 0)),
+            "total_projects": len(projects),
+            "shard_size": shard_size,
+            "shards": shards,
+        }
+        summary_file = self._write_hashed(out_dir, "summary", summary)
+        files = [summary_file] + [shard["file"] for shard in shards]
+
+        template = Path(__file__).resolve().parent.parent / "templates" / "dashboard.html"
+        shutil.copyfile(template, os.path.join(out_dir, "index.html"))
+
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"summary": summary_file, "files": files}, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+        keep = set(files) | previous_files
+        for name in os.listdir(out_dir):
+            if HASHED_FILE_RE.match(name) and name not in keep:
+                os.remove(os.path.join(out_dir, name))
+
+        return manifest_path
+
+    @staticmethod
+    def _write_hashed(out_dir: str, prefix: str, data: dict) -> str:
+        """Write JSON under a content-hashed name; identical content reuses the file"""
+        body = json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        name = f"{prefix}.{hashlib.sha256(body).hexdigest()[:16]}.json"
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{path}.tmp", path)
+        return name
+
+
+# =============================================================================
+# Batch Mode
+# =============================================================================
+
+# Snapshots loaded by the batch parent; inherited by (or sent once to) each worker
+_SNAPSHOTS: dict[str, dict] = {}
+
+
+def load_batch_manifest(path: str) -> list[dict]:
+    """Read a batch manifest: a JSON list of jobs, or {"jobs": [...]}.
+
+    Each job has "current", optional "baseline"/"previous", "formats"
+    (default ["markdown"]) and "output", a path stem that gets one file per
+    format (<output>.md, .html, .json). Relative paths are resolved against
+    the manifest's directory.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    jobs = data.get("jobs", []) if isinstance(data, dict) else data
+    if not isinstance(jobs, list):
+        raise ValueError(f"{path} must hold a list of jobs")
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def resolve(value: Optional[str]) -> Optional[str]:
+        return os.path.join(base_dir, os.path.expanduser(value)) if value else None
+
+    resolved = []
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise ValueError(f"Job {i} in {path} is not an object")
+        if not job.get("current") or not job.get("output"):
+            raise ValueError(f"Job {i} in {path} needs 'current' and 'output'")
+        formats = job.get("formats") or ["markdown"]
+        unknown = [fmt for fmt in formats if fmt not in FORMAT_EXTENSIONS]
+        if unknown:
+            raise ValueError(f"Job {i} in {path} has unknown formats: {', '.join(unknown)}")
+        resolved.append({
+            "name": job.get("name") or job["output"],
+            "current": resolve(job["current"]),
+            "baseline": resolve(job.get("baseline")),
+            "previous": resolve(job.get("previous")),
+            "formats": formats,
+            "output": resolve(job["output"]),
+        })
+    return resolved
+
+
+def _load_snapshots(jobs: list[dict]) -> tuple[dict[str, dict], dict[str, str]]:
+    """Load every distinct snapshot path once; returns (snapshots, load errors)"""
+    snapshots, errors = {}, {}
+    paths = {job[role] for job in jobs for role in ("current", "baseline", "previous") if job[role]}
+    for path in sorted(paths):
+        try:
+            with open(path) as f:
+                snapshots[path] = json.load(f)
+        except (OSError, ValueError) as e:
+            errors[path] = str(e)
+    return snapshots, errors
+
+
+def _init_batch_worker(snapshots: dict[str, dict]) -> None:
+    global _SNAPSHOTS
+    _SNAPSHOTS = snapshots
+
+
+def _render_batch_job(job: dict) -> dict:
+    """Render every format of one job from the shared snapshots"""
+    started = time.perf_counter()
+    result = {"name": job["name"], "outputs": [], "error": None}
+    try:
+        generator = ReportGenerator.from_snapshots(
+            _SNAPSHOTS[job["current"]],
+            _SNAPSHOTS[job["baseline"]] if job["baseline"] else None,
+            _SNAPSHOTS[job["previous"]] if job["previous"] else None,
+        )
+        os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+        for fmt in job["formats"]:
+            path = f"{job['output']}.{FORMAT_EXTENSIONS[fmt]}"
+            with open(path, "w") as f:
+                f.write(generator.generate_report(format=fmt))
+            result["outputs"].append(path)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(manifest_path: str, workers: Optional[int] = None) -> int:
+    """Render all jobs in a manifest and print a timing/failure summary"""
+    started = time.perf_counter()
+    jobs = load_batch_manifest(manifest_path)
+    snapshots, load_errors = _load_snapshots(jobs)
+    load_seconds = time.perf_counter() - started
+
+    results, runnable = [], []
+    for job in jobs:
+        missing = [job[role] for role in ("current", "baseline", "previous") if job[role] in load_errors]
+        if missing:
+            error = "; ".join(f"{path}: {load_errors[path]}" for path in missing)
+            results.append({"name": job["name"], "outputs": [], "error": f"Cannot load {error}", "seconds": 0.0})
+        else:
+            runnable.append(job)
+
+    # Never start more processes than there are jobs to render
+    workers = max(1, min(workers or os.cpu_count() or 1, len(runnable)))
+    if workers == 1:
+        _init_batch_worker(snapshots)
+        results.extend(_render_batch_job(job) for job in runnable)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_batch_worker, initargs=(snapshots,)
+        ) as pool:
+            futures = [pool.submit(_render_batch_job, job) for job in runnable]
+            results.extend(future.result() for future in as_completed(futures))
+
+    total_seconds = time.perf_counter() - started
+    failures = [r for r in results if r["error"]]
+    reports = sum(len(r["outputs"]) for r in results)
+
+    print(
+        f"Batch: {len(jobs)} jobs, {reports} reports, {len(failures)} failed in {total_seconds:.2f}s "
+        f"({len(snapshots)} snapshots loaded in {load_seconds:.2f}s, {workers} worker{'s' if workers != 1 else ''})"
+    )
+    slowest = sorted((r for r in results if not r["error"]), key=lambda r: -r["seconds"])[:5]
+    if slowest:
+        print("Slowest jobs:")
+        for r in slowest:
+            print(f"  {r['seconds']:.3f}s  {r['name']}")
+    if failures:
+        print("Failures:")
+        for r in sorted(failures, key=lambda r: r["name"]):
+            print(f"  {r['name']}: {r['error']}")
+
+    return 1 if failures else 0
+
 
 def main():
     parser = argparse.ArgumentParser(description="Generate Claude Code metrics report")
@@ -416,9 +736,23 @@ def main():
     parser.add_argument("--previous", type=str, help="Path to previous month metrics JSON")
     parser.add_argument("--format", choices=["markdown", "html", "json"], default="markdown")
     parser.add_argument("--output", type=str, help="Output file path")
+    parser.add_argument("--dashboard", type=str, metavar="DIR",
+                        help="Publish a static dashboard bundle (summary + lazily loaded project shards) to DIR")
+    parser.add_argument("--shard-size", type=int, default=DASHBOARD_SHARD_SIZE,
+                        help="Projects per dashboard shard")
+    parser.add_argument("--batch", type=str, metavar="MANIFEST",
+                        help="Render every (current, baseline, previous, formats, output) job in a JSON manifest")
+    parser.add_argument("--workers", type=int, help="Worker processes for --batch (default: CPU count)")
 
     args = parser.parse_args()
 
+    if args.batch:
+        try:
+            return run_batch(args.batch, args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read batch manifest {args.batch}: {e}")
+            return 1
+
     # Check if current metrics file exists
     if not Path(args.current).exists():
         print(f"Error: Current metrics file not found: {args.current}")
@@ -432,6 +766,11 @@ def main():
         previous_metrics_path=args.previous,
     )
 
+    if args.dashboard:
+        manifest = generator.publish_dashboard(args.dashboard, shard_size=max(1, args.shard_size))
+        print(f"Dashboard bundle published: {manifest}")
+        return 0
+
     report = generator.generate_report(format=args.format)
 
     if args.output:
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Issue Tracker Export Loading
+
+Reads JIRA and Linear exports dropped on disk (CSV, JSON, JSON Lines,
+optionally gzipped) into a compact index keyed by issue key, so that
+collect_metrics.py can report bug counts and reopen rates without a live
+tracker connection.
+
+- Files are parsed incrementally: CSV row by row, JSON Lines line by line,
+  and large JSON documents one array element at a time, so memory is bounded
+  by the largest single issue rather than the export size.
+- The index covers one export directory and keeps each file's facts
+  separately, keyed by path with its size and mtime. Repeat runs only parse
+  new or changed files; the facts of changed or deleted files are dropped
+  first, so they never linger in the totals.
+
+Per issue and file the index keeps whether it is a bug, its created date,
+the dates it was resolved and the dates it was reopened (a status change
+from a done state back to an open state, or into a "Reopened" status).
+Files are combined oldest first: dates are unioned, and the newest export
+that mentions an issue's type/labels or created date wins.
+"""
+
+import csv
+import gzip
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+from typing import Callable, Iterator, Optional, TextIO
+
+EXPORT_SUFFIXES = (".csv", ".json", ".jsonl", ".ndjson")
+DONE_STATUSES = {"done", "closed", "resolved", "complete", "completed", "canceled", "cancelled", "won't fix"}
+REOPEN_STATUSES = {"reopened", "re-opened"}
+JSON_CHUNK_CHARS = 1 << 16
+# Records parsed between checks of a caller's should_stop()
+STOP_CHECK_RECORDS = 1000
+INDEX_VERSION = 2
+
+# CSV header aliases (compared case-insensitively)
+KEY_COLUMNS = ("issue key", "key", "identifier", "id")
+TYPE_COLUMNS = ("issue type", "type")
+LABEL_COLUMNS = ("labels", "label")
+CREATED_COLUMNS = ("created", "created at", "createdat")
+RESOLVED_COLUMNS = ("resolved", "resolution date", "resolutiondate", "completed", "completed at", "completedat")
+DATE_COLUMNS = ("date", "changed", "changed at", "created")
+FROM_COLUMNS = ("from", "from status", "fromstring", "from state")
+TO_COLUMNS = ("to", "to status", "tostring", "to state")
+FIELD_COLUMNS = ("field",)
+
+CSV_DATE_FORMATS = ("%d/%b/%y %I:%M %p", "%d/%b/%Y %I:%M %p", "%m/%d/%Y %H:%M", "%m/%d/%Y", "%Y/%m/%d")
+
+
+def _raise_csv_field_limit() -> None:
+    """Allow huge fields (JIRA descriptions) instead of failing the whole file at 128 KiB"""
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:
+            limit //= 2
+
+
+_raise_csv_field_limit()
+
+
+def normalize_date(value) -> Optional[str]:
+    """Normalize tracker timestamps to YYYY-MM-DD"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+        return value[:10]
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _is_done(status: Optional[str]) -> bool:
+    return bool(status) and status.strip().lower() in DONE_STATUSES
+
+
+def is_reopen(from_status: Optional[str], to_status: Optional[str]) -> bool:
+    """Whether a status transition reopens an issue"""
+    if to_status and to_status.strip().lower() in REOPEN_STATUSES:
+        return True
+    return _is_done(from_status) and bool(to_status) and not _is_done(to_status)
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def _base_suffix(path: str) -> str:
+    return os.path.splitext(path[:-3] if path.endswith(".gz") else path)[1].lower()
+
+
+# =============================================================================
+# Streaming readers
+# =============================================================================
+
+def iter_json_elements(f: TextIO) -> Iterator:
+    """Stream elements of the main issue array in a JSON document.
+
+    Handles a top-level array, or an object whose "issues" / "nodes" key
+    holds the array (JIRA search and Linear GraphQL exports). Only one
+    element is decoded at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(JSON_CHUNK_CHARS)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    # Locate the opening bracket of the issue array
+    while True:
+        stripped = buf.lstrip()
+        if stripped.startswith("["):
+            pos = len(buf) - len(stripped) + 1
+            break
+        found = -1
+        for key in ('"issues"', '"nodes"'):
+            idx = buf.find(key)
+            if idx != -1:
+                bracket = buf.find("[", idx)
+                if bracket != -1:
+                    found = bracket
+                    break
+        if found != -1:
+            pos = found + 1
+            break
+        if not fill():
+            return
+
+    while True:
+        # Skip separators
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof or not fill():
+                break
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+
+        try:
+            element, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if not fill():
+                return
+            continue
+
+        if end == len(buf) and not eof:
+            # A number or literal might continue past the buffer; re-read
+            if fill():
+                continue
+        pos = end
+        yield element
+
+
+def _get(row: dict, names: tuple[str, ...]) -> Optional[str]:
+    for name in names:
+        value = row.get(name)
+        if value:
+            return value
+    return None
+
+
+def iter_csv_records(f: TextIO) -> Iterator[dict]:
+    """Normalized records from an issue or changelog CSV export"""
+    reader = csv.reader(f)
+    try:
+        header = [h.strip().lower() for h in next(reader)]
+    except StopIteration:
+        return
+
+    is_changelog = any(h in FROM_COLUMNS for h in header) and any(h in TO_COLUMNS for h in header)
+    # JIRA repeats the Labels column once per label
+    label_idx = [i for i, h in enumerate(header) if h in LABEL_COLUMNS]
+
+    for values in reader:
+        row = {}
+        for name, value in zip(header, values):
+            row.setdefault(name, value)
+
+        key = _get(row, KEY_COLUMNS)
+        if not key:
+            continue
+
+        if is_changelog:
+            field = _get(row, FIELD_COLUMNS)
+            if field and field.strip().lower() != "status":
+                continue
+            yield {
+                "kind": "transition",
+                "key": key,
+                "date": normalize_date(_get(row, DATE_COLUMNS)),
+                "from": _get(row, FROM_COLUMNS),
+                "to": _get(row, TO_COLUMNS),
+            }
+        else:
+            labels = []
+            for i in label_idx:
+                if i < len(values):
+                    labels.extend(part.strip() for part in values[i].split(",") if part.strip())
+            yield {
+                "kind": "issue",
+                "key": key,
+                "type": _get(row, TYPE_COLUMNS),
+                "labels": labels,
+                "created": normalize_date(_get(row, CREATED_COLUMNS)),
+                "resolved": normalize_date(_get(row, RESOLVED_COLUMNS)),
+            }
+
+
+def _names(value) -> list[str]:
+    """Label names from JIRA (list of str) or Linear ({"nodes": [{"name"}]}) shapes"""
+    if isinstance(value, dict):
+        value = value.get("nodes", [])
+    names = []
+    for item in value or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if name:
+            names.append(str(name))
+    return names
+
+
+def _state_name(value) -> Optional[str]:
+    if isinstance(value, dict):
+        return value.get("name")
+    return value
+
+
+def normalize_json_issue(obj: dict) -> Iterator[dict]:
+    """Normalized records from one JIRA or Linear JSON issue"""
+    if not isinstance(obj, dict):
+        return
+
+    fields = obj.get("fields") or {}
+    key = obj.get("key") or obj.get("identifier") or obj.get("id")
+    if not key:
+        return
+
+    issue_type = fields.get("issuetype") or obj.get("issueType") or obj.get("type")
+    yield {
+        "kind": "issue",
+        "key": key,
+        "type": _state_name(issue_type),
+        "labels": _names(fields.get("labels") or obj.get("labels")),
+        "created": normalize_date(fields.get("created") or obj.get("createdAt") or obj.get("created")),
+        "resolved": normalize_date(
+            fields.get("resolutiondate") or obj.get("completedAt") or obj.get("resolved")
+        ),
+    }
+
+    # JIRA: changelog.histories[].items[]
+    for history in (obj.get("changelog") or {}).get("histories", []):
+        for item in history.get("items", []):
+            if item.get("field") == "status":
+                yield {
+                    "kind": "transition",
+                    "key": key,
+                    "date": normalize_date(history.get("created")),
+                    "from": item.get("fromString"),
+                    "to": item.get("toString"),
+                }
+
+    # Linear: history.nodes[] with fromState/toState
+    history = obj.get("history") or {}
+    for entry in history.get("nodes", []) if isinstance(history, dict) else history:
+        if entry.get("toState"):
+            yield {
+                "kind": "transition",
+                "key": key,
+                "date": normalize_date(entry.get("createdAt")),
+                "from": _state_name(entry.get("fromState")),
+                "to": _state_name(entry.get("toState")),
+            }
+
+
+def iter_export_records(path: str) -> Iterator[dict]:
+    """Normalized issue/transition records from any supported export file"""
+    suffix = _base_suffix(path)
+    with _open_text(path) as f:
+        if suffix == ".csv":
+            yield from iter_csv_records(f)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield from normalize_json_issue(json.loads(line))
+                    except ValueError:
+                        continue
+        else:
+            for element in iter_json_elements(f):
+                yield from normalize_json_issue(element)
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+class IssueIndex:
+    """Per-issue facts accumulated from the export files of one directory"""
+
+    def __init__(self, data: Optional[dict] = None):
+        if not data or data.get("version") != INDEX_VERSION:
+            # files: path -> {"size", "mtime", "issues": {key: facts}}
+            data = {"version": INDEX_VERSION, "files": {}}
+        self.data = data
+        self.errors: list[str] = []
+        # Set when update() was cut short by should_stop()
+        self.stopped = False
+        self._issues: Optional[dict] = None
+
+    @staticmethod
+    def _add_date(dates: list, date: Optional[str]) -> None:
+        if date and date not in dates:
+            dates.append(date)
+
+    @classmethod
+    def add(cls, issues: dict, record: dict) -> None:
+        """Fold one normalized record into a file's per-issue facts"""
+        issue = issues.setdefault(record["key"], {"bug": None, "created": None, "resolved": [], "reopened": []})
+        if record["kind"] == "issue":
+            issue_type = (record.get("type") or "").strip().lower()
+            labels = {label.lower() for label in record.get("labels", [])}
+            # A later record for the same issue replaces the type (e.g. re-triaged away from bug)
+            issue["bug"] = issue_type == "bug" or "bug" in labels
+            if record.get("created"):
+                issue["created"] = record["created"]
+            cls._add_date(issue["resolved"], record.get("resolved"))
+        elif record["kind"] == "transition":
+            if is_reopen(record.get("from"), record.get("to")):
+                cls._add_date(issue["reopened"], record.get("date"))
+            elif _is_done(record.get("to")):
+                cls._add_date(issue["resolved"], record.get("date"))
+
+    def update(self, export_dir: str, should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """Sync with the export files on disk; returns how many files were parsed or dropped.
+
+        When `should_stop` returns true the update ends early (setting
+        `stopped`): the file being parsed is left for the next run and
+        nothing is purged, since not every file was seen.
+        """
+        files = self.data["files"]
+        seen = set()
+        changed = 0
+
+        for root, _, names in os.walk(export_dir):
+            for name in sorted(names):
+                if should_stop and should_stop():
+                    self.stopped = True
+                    break
+                path = os.path.join(root, name)
+                if _base_suffix(path) not in EXPORT_SUFFIXES:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+
+                key = os.path.abspath(path)
+                seen.add(key)
+                known = files.get(key)
+                if known and known["size"] == st.st_size and known["mtime"] == st.st_mtime:
+                    continue
+
+                # The file is new or was rewritten: forget what it said before
+                files.pop(key, None)
+                changed += 1
+                issues: dict = {}
+                try:
+                    for i, record in enumerate(iter_export_records(path), 1):
+                        self.add(issues, record)
+                        if should_stop and i % STOP_CHECK_RECORDS == 0 and should_stop():
+                            self.stopped = True
+                            break
+                except (OSError, EOFError, zlib.error, csv.Error) as e:
+                    # Unreadable, or a truncated/corrupt .gz from a half-finished sync
+                    self.errors.append(f"{path}: {e}")
+                    continue
+                if self.stopped:
+                    break
+                files[key] = {"size": st.st_size, "mtime": st.st_mtime, "issues": issues}
+            if self.stopped:
+                break
+
+        if not self.stopped:
+            for key in [k for k in files if k not in seen]:
+                del files[key]
+                changed += 1
+
+        if changed:
+            self._issues = None
+        return changed
+
+    def issues(self) -> dict[str, dict]:
+        """Per-issue facts combined across files, oldest file first"""
+        if self._issues is None:
+            combined: dict[str, dict] = {}
+            ordered = sorted(self.data["files"].items(), key=lambda item: (item[1]["mtime"], item[0]))
+            for _, entry in ordered:
+                for key, facts in entry["issues"].items():
+                    issue = combined.setdefault(key, {"bug": False, "created": None, "resolved": [], "reopened": []})
+                    if facts["bug"] is not None:
+                        issue["bug"] = facts["bug"]
+                    if facts["created"]:
+                        issue["created"] = facts["created"]
+                    for name in ("resolved", "reopened"):
+                        for date in facts[name]:
+                            self._add_date(issue[name], date)
+            self._issues = combined
+        return self._issues
+
+    def bug_totals(self, since_day: str) -> tuple[int, int, int]:
+        """(bugs created, bugs reopened, bugs resolved) on or after since_day"""
+        created = reopened = resolved = 0
+        for issue in self.issues().values():
+            if not issue["bug"]:
+                continue
+            if issue["created"] and issue["created"] >= since_day:
+                created += 1
+            if any(d >= since_day for d in issue["reopened"]):
+                reopened += 1
+            if any(d >= since_day for d in issue["resolved"]):
+                resolved += 1
+        return created, reopened, resolved
+
+    def bug_totals_by(self, key_of) -> dict[str, list[int]]:
+        """[created, reopened, resolved] bug totals per period in one pass.
+
+        `key_of` maps a YYYY-MM-DD day to a period key, or None to skip it.
+        An issue counts at most once per period for each total.
+        """
+        totals: dict[str, list[int]] = {}
+        for issue in self.issues().values():
+            if not issue["bug"]:
+                continue
+            for i, days in enumerate(([issue["created"]], issue["reopened"], issue["resolved"])):
+                for key in {key_of(day) for day in days if day}:
+                    if key is not None:
+                        totals.setdefault(key, [0, 0, 0])[i] += 1
+        return totals
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Knowledge Base Search Index
+
+Inverted index with BM25 ranking over a repo's .claude/learnings, patterns,
+failures and decisions, used by the /search-knowledge command instead of
+grep-ing every file on every query.
+
+- The index is a JSON file under ~/.claude-metrics/cache/knowledge/ (one per
+  repo); nothing is written into the repo itself.
+- Updates are incremental: files whose mtime and size are unchanged are not
+  read, files that were touched but whose content hash is unchanged are not
+  re-tokenized, and deleted files are dropped from the postings.
+- Queries refresh the index first (a stat per file), then score only the
+  posting lists of the query terms, and read just the top files to cut
+  snippets.
+
+Usage:
+    python knowledge_index.py query "ferpa logging"       # Ranked results for the current repo
+    python knowledge_index.py query "retry" --repo ../api -n 5
+    python knowledge_index.py build                        # Update the index without querying
+    python knowledge_index.py stats                        # Documents, terms, stale files
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+KNOWLEDGE_DIRS = ("learnings", "patterns", "failures", "decisions")
+SKIPPED_FILES = (".gitkeep", "TEMPLATE.md")
+INDEX_VERSION = 1
+DEFAULT_INDEX_DIR = "~/.claude-metrics/cache/knowledge"
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_CHARS = 200
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_-]*[a-z0-9]|[a-z0-9]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or so that the "
+    "their then there these this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, minus stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def default_index_path(repo_path: str, index_dir: str = DEFAULT_INDEX_DIR) -> str:
+    """Per-repo index file in the shared metrics cache (or another index directory)"""
+    key = hashlib.sha1(os.path.abspath(repo_path).encode()).hexdigest()[:16]
+    return os.path.join(os.path.expanduser(index_dir), f"{key}.json")
+
+
+def iter_knowledge_files(repo_path: str):
+    """Yield (doc id "subdir/name", path, stat) for every indexable file"""
+    claude_dir = os.path.join(repo_path, ".claude")
+    for subdir in KNOWLEDGE_DIRS:
+        try:
+            with os.scandir(os.path.join(claude_dir, subdir)) as it:
+                for entry in it:
+                    if entry.name in SKIPPED_FILES or not entry.is_file():
+                        continue
+                    yield f"{subdir}/{entry.name}", entry.path, entry.stat()
+        except OSError:
+            continue
+
+
+def _title(text: str, fallback: str) -> str:
+    """First markdown heading, or the file name"""
+    for line in text.splitlines():
+        if line.startswith("#"):
+            return line.lstrip("#").strip() or fallback
+    return fallback
+
+
+def _snippet(text: str, terms: set[str]) -> str:
+    """The line (plus its neighbour) with the most query terms"""
+    lines = [line.strip() for line in text.splitlines()]
+    best, best_hits = 0, -1
+    for i, line in enumerate(lines):
+        if not line or line == "---":
+            continue
+        hits = len(terms & set(tokenize(line)))
+        if hits > best_hits:
+            best, best_hits = i, hits
+    snippet = " ".join(line for line in lines[best:best + 2] if line)
+    return snippet if len(snippet) <= SNIPPET_CHARS else snippet[:SNIPPET_CHARS - 1] + "…"
+
+
+class KnowledgeIndex:
+    """Incremental BM25 index over one repo's .claude/ knowledge directories"""
+
+    def __init__(self, repo_path: str, index_path: Optional[str] = None):
+        self.repo_path = os.path.abspath(repo_path)
+        self.index_path = index_path or default_index_path(repo_path)
+        self.data = self._load()
+
+    @staticmethod
+    def _empty() -> dict:
+        # docs: id -> {mtime, size, sha1, length, title, terms}
+        # postings: term -> {doc id: term frequency}
+        return {"version": INDEX_VERSION, "updated_at": None, "total_length": 0, "docs": {}, "postings": {}}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self._empty()
+        return data if data.get("version") == INDEX_VERSION else self._empty()
+
+    def save(self) -> None:
+        """Atomically write the index (best effort)"""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    @property
+    def exists(self) -> bool:
+        return self.data["updated_at"] is not None
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self.data["docs"].pop(doc_id)
+        self.data["total_length"] -= doc["length"]
+        for term in doc["terms"]:
+            postings = self.data["postings"].get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.data["postings"][term]
+
+    def _add(self, doc_id: str, text: str, st: os.stat_result, sha1: str) -> None:
+        counts: dict[str, int] = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            self.data["postings"].setdefault(term, {})[doc_id] = tf
+
+        length = sum(counts.values())
+        self.data["total_length"] += length
+        self.data["docs"][doc_id] = {
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "sha1": sha1,
+            "length": length,
+            "title": _title(text, doc_id),
+            "terms": sorted(counts),
+        }
+
+    def update(self) -> dict[str, int]:
+        """Bring the index up to date; returns counts of added/changed/removed docs"""
+        docs = self.data["docs"]
+        seen = set()
+        changes = {"added": 0, "changed": 0, "removed": 0}
+        # Any stored metadata change, including a touched but unedited file
+        dirty = not self.exists
+
+        for doc_id, path, st in iter_knowledge_files(self.repo_path):
+            seen.add(doc_id)
+            doc = docs.get(doc_id)
+            if doc and doc["mtime"] == st.st_mtime and doc["size"] == st.st_size:
+                continue
+
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            sha1 = hashlib.sha1(raw).hexdigest()
+
+            dirty = True
+            if doc and doc["sha1"] == sha1:
+                # Touched but not edited: no need to re-tokenize, but remember the new mtime
+                doc["mtime"], doc["size"] = st.st_mtime, st.st_size
+                continue
+
+            if doc:
+                self._remove(doc_id)
+                changes["changed"] += 1
+            else:
+                changes["added"] += 1
+            self._add(doc_id, raw.decode("utf-8", errors="replace"), st, sha1)
+
+        for doc_id in [d for d in docs if d not in seen]:
+            self._remove(doc_id)
+            changes["removed"] += 1
+            dirty = True
+
+        if dirty:
+            self.data["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self.save()
+        return changes
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """BM25-ranked documents for a query, with snippets"""
+        terms = set(tokenize(query))
+        n_docs = len(self.data["docs"])
+        if not terms or not n_docs:
+            return []
+
+        avg_length = self.data["total_length"] / n_docs
+        scores: dict[str, float] = {}
+        for term in terms:
+            postings = self.data["postings"].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                length = self.data["docs"][doc_id]["length"]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for doc_id, score in ranked:
+            path = os.path.join(self.repo_path, ".claude", doc_id)
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    snippet = _snippet(f.read(), terms)
+            except OSError:
+                snippet = ""
+            results.append({
+                "doc": doc_id,
+                "title": self.data["docs"][doc_id]["title"],
+                "score": round(score, 3),
+                "snippet": snippet,
+            })
+        return results
+
+    def stats(self, current_files: Optional[dict[str, tuple[int, float]]] = None) -> dict:
+        """Index size and staleness.
+
+        `current_files` maps doc id -> (size, mtime) for the files on disk;
+        when omitted they are stat'ed here. A document is stale when it is
+        new, changed or deleted since the last update.
+        """
+        if current_files is None:
+            current_files = {
+                doc_id: (st.st_size, st.st_mtime) for doc_id, _, st in iter_knowledge_files(self.repo_path)
+            }
+
+        docs = self.data["docs"]
+        stale = sum(
+            1 for doc_id, (size, mtime) in current_files.items()
+            if doc_id not in docs or docs[doc_id]["size"] != size or docs[doc_id]["mtime"] != mtime
+        )
+        stale += sum(1 for doc_id in docs if doc_id not in current_files)
+
+        return {
+            "documents": len(docs),
+            "terms": len(self.data["postings"]),
+            "stale_documents": stale,
+            "updated_at": self.data["updated_at"],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the .claude/ knowledge base")
+    parser.add_argument("--repo", default=os.getcwd(), help="Repository root (default: current directory)")
+    parser.add_argument("--index", help="Index file (default: per-repo file in ~/.claude-metrics/cache)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = subparsers.add_parser("query", help="Ranked search with snippets")
+    query_parser.add_argument("terms", nargs="+", help="Search terms")
+    query_parser.add_argument("-n", "--limit", type=int, default=10, help="Maximum results")
+    query_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    subparsers.add_parser("build", help="Create or update the index")
+    subparsers.add_parser("stats", help="Show index statistics")
+
+    args = parser.parse_args()
+    index = KnowledgeIndex(args.repo, args.index)
+
+    if args.command == "stats":
+        print(json.dumps(index.stats(), indent=2))
+        return 0
+
+    started = time.perf_counter()
+    changes = index.update()
+
+    if args.command == "build":
+        stats = index.stats()
+        print(
+            f"Indexed {stats['documents']} documents, {stats['terms']} terms "
+            f"(+{changes['added']} ~{changes['changed']} -{changes['removed']}) -> {index.index_path}"
+        )
+        return 0
+
+    results = index.search(" ".join(args.terms), args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif not results:
+        print(f"No matches in .claude/{{{','.join(KNOWLEDGE_DIRS)}}}")
+    else:
+        for rank, result in enumerate(results, 1):
+            print(f"{rank:>2}. .claude/{result['doc']}  ({result['score']})  {result['title']}")
+            if result["snippet"]:
+                print(f"    {result['snippet']}")
+        print(f"\n{len(results)} results in {elapsed_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
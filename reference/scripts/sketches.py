@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Mergeable Sketches for Metrics Collection
+
+Small, dependency-free data structures used by collect_metrics.py to keep
+memory bounded on large fleets while still allowing results from separate
+repos, runs or machines to be combined:
+
+- ExactCounter: distinct counting with a plain set (small fleets)
+- HyperLogLog:  approximate distinct counting with a configurable error bound
+- KLLSketch:    streaming quantiles (p50/p90/p99) over per-developer activity
+
+Every sketch supports add(), merge(), count(), copy() and a JSON-safe
+to_dict()/from_dict() round trip so it can be cached on disk or shipped
+between shards.
+"""
+
+import base64
+import hashlib
+import math
+from typing import Iterable, Optional, Union
+
+
+def _hash64(value: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ExactCounter:
+    """Exact distinct counter backed by a set"""
+
+    kind = "exact"
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values = set(values)
+
+    def add(self, value: str) -> None:
+        self.values.add(value)
+
+    def merge(self, other: "ExactCounter") -> None:
+        self.values |= other.values
+
+    def count(self) -> int:
+        return len(self.values)
+
+    def copy(self) -> "ExactCounter":
+        return ExactCounter(self.values)
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "values": sorted(self.values)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ExactCounter":
+        return cls(data.get("values", []))
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter.
+
+    The number of registers is derived from the requested relative standard
+    error (≈ 1.04 / sqrt(m)), so 1% error costs 16 KiB regardless of how many
+    developers are counted.
+
+    A sketch starts sparse (a dict of the few non-zero registers) and only
+    switches to the dense register array once it fills up, so the many
+    per-day sketches of a small team cost a few entries each and merging
+    them touches only those entries.
+    """
+
+    kind = "hll"
+    MIN_PRECISION = 4
+    MAX_PRECISION = 16
+    # Non-zero registers kept sparsely before converting to the dense array
+    # (a dict entry costs far more than the one byte a dense register does)
+    SPARSE_FRACTION = 1 / 128
+
+    def __init__(self, error: float = 0.01, precision: int = None):
+        if precision is None:
+            precision = self.precision_for_error(error)
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(f"HyperLogLog precision must be in [{self.MIN_PRECISION}, {self.MAX_PRECISION}]")
+        self.precision = precision
+        self.m = 1 << precision
+        self.sparse_limit = max(1, int(self.m * self.SPARSE_FRACTION))
+        # Exactly one of the two representations is in use
+        self.sparse: Optional[dict[int, int]] = {}
+        self.registers: Optional[bytearray] = None
+
+    @classmethod
+    def precision_for_error(cls, error: float) -> int:
+        """Smallest precision whose standard error is at most `error`"""
+        if error <= 0:
+            raise ValueError("HyperLogLog error must be positive")
+        p = math.ceil(math.log2((1.04 / error) ** 2))
+        return max(cls.MIN_PRECISION, min(cls.MAX_PRECISION, p))
+
+    def _densify(self) -> None:
+        registers = bytearray(self.m)
+        for idx, rank in self.sparse.items():
+            registers[idx] = rank
+        self.registers, self.sparse = registers, None
+
+    def add(self, value: str) -> None:
+        x = _hash64(value)
+        idx = x >> (64 - self.precision)
+        rest = (x << self.precision) & ((1 << 64) - 1)
+        rank = (64 - self.precision + 1) if rest == 0 else (64 - rest.bit_length() + 1)
+        if self.sparse is not None:
+            if rank > self.sparse.get(idx, 0):
+                self.sparse[idx] = rank
+                if len(self.sparse) > self.sparse_limit:
+                    self._densify()
+        elif rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+
+        if other.sparse is not None:
+            if self.sparse is not None:
+                mine = self.sparse
+                for idx, rank in other.sparse.items():
+                    if rank > mine.get(idx, 0):
+                        mine[idx] = rank
+                if len(mine) > self.sparse_limit:
+                    self._densify()
+            else:
+                registers = self.registers
+                for idx, rank in other.sparse.items():
+                    if rank > registers[idx]:
+                        registers[idx] = rank
+        else:
+            if self.sparse is not None:
+                self._densify()
+            self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        if self.sparse is not None:
+            zeros = m - len(self.sparse)
+            harmonic = zeros + sum(2.0 ** -r for r in self.sparse.values())
+        else:
+            zeros = self.registers.count(0)
+            harmonic = sum(2.0 ** -r for r in self.registers)
+
+        estimate = alpha * m * m / harmonic
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def copy(self) -> "HyperLogLog":
+        clone = HyperLogLog(precision=self.precision)
+        if self.sparse is not None:
+            clone.sparse = dict(self.sparse)
+        else:
+            clone.sparse, clone.registers = None, bytearray(self.registers)
+        return clone
+
+    def to_dict(self) -> dict:
+        # Per-day sketches usually touch a handful of registers; store those
+        # sparsely so a year of daily sketches stays small on disk.
+        if self.sparse is not None:
+            nonzero = sorted(self.sparse.items())
+        else:
+            nonzero = [(i, r) for i, r in enumerate(self.registers) if r]
+        if len(nonzero) * 8 < self.m:
+            return {"kind": self.kind, "precision": self.precision, "sparse": [list(item) for item in nonzero]}
+        registers = self.registers
+        if registers is None:
+            registers = bytearray(self.m)
+            for idx, rank in nonzero:
+                registers[idx] = rank
+        return {
+            "kind": self.kind,
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        sketch = cls(precision=data["precision"])
+        if "sparse" in data:
+            sketch.sparse = {idx: rank for idx, rank in data["sparse"]}
+            if len(sketch.sparse) > sketch.sparse_limit:
+                sketch._densify()
+        else:
+            sketch.sparse, sketch.registers = None, bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+DistinctCounter = Union[ExactCounter, HyperLogLog]
+
+
+def make_distinct_counter(mode: str = "exact", error: float = 0.01) -> DistinctCounter:
+    """Create an empty distinct counter for the given mode"""
+    if mode == "exact":
+        return ExactCounter()
+    elif mode == "hll":
+        return HyperLogLog(error=error)
+    else:
+        raise ValueError(f"Unknown distinct-count mode: {mode}")
+
+
+def distinct_counter_from_dict(data: dict) -> DistinctCounter:
+    """Rebuild a distinct counter from its to_dict() form"""
+    if data.get("kind") == HyperLogLog.kind:
+        return HyperLogLog.from_dict(data)
+    return ExactCounter.from_dict(data)
+
+
+def union_count(counters: Iterable[DistinctCounter]) -> int:
+    """Distinct count over the union of several counters of the same kind"""
+    total = None
+    for counter in counters:
+        if total is None:
+            total = counter.copy()
+        else:
+            total.merge(counter)
+    return total.count() if total is not None else 0
+
+
+class KLLSketch:
+    """KLL quantile sketch.
+
+    Values enter a level-0 buffer; when a level fills up it is sorted and
+    every other item is promoted to the next level with twice the weight.
+    Lower levels get geometrically smaller capacities, so memory is
+    O(k) no matter how many values are added, and rank error is about
+    1.7 / k. Fewer than ~k values are kept exactly.
+
+    The promoted half alternates between compactions instead of being
+    chosen at random, so the same input always yields the same report.
+    """
+
+    kind = "kll"
+    SHRINK = 2 / 3
+
+    def __init__(self, k: int = 200):
+        if k < 8:
+            raise ValueError("KLLSketch k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.levels: list[list[float]] = [[]]
+        self._offset = 0
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * self.SHRINK ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                # An odd item out stays behind at its current weight
+                keep = items[:len(items) % 2]
+                self.levels[level + 1].extend(items[len(keep) + self._offset::2])
+                self.levels[level] = keep
+                self._offset ^= 1
+                break
+
+    def add(self, value: float) -> None:
+        self.levels[0].append(float(value))
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def count(self) -> int:
+        return self.n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at rank q (0..1), or None for an empty sketch"""
+        weighted = sorted(
+            (value, 1 << level) for level, items in enumerate(self.levels) for value in items
+        )
+        if not weighted:
+            return None
+
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def copy(self) -> "KLLSketch":
+        clone = KLLSketch(self.k)
+        clone.n = self.n
+        clone.levels = [list(items) for items in self.levels]
+        clone._offset = self._offset
+        return clone
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(data.get("k", 200))
+        sketch.n = data.get("n", 0)
+        sketch.levels = [list(items) for items in data.get("levels", [[]])] or [[]]
+        return sketch
@@ -0,0 +1,50 @@
+"""Make the metrics scripts and hook scripts importable the way they import each other"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, "reference", "scripts"), os.path.join(ROOT, "STARTER_KIT", ".hooks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Settings the collector reads from the environment when not passed in
+ENV_VARS = (
+    "GITHUB_TOKEN", "GITHUB_ORG", "TOTAL_DEVELOPERS", "ISSUE_EXPORT_DIR", "CLAUDE_METRICS_HOOK_LOG",
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    """Keep tests away from the real home directory, caches and credentials"""
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    for name in ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+
+
+def git_commit(repo, day: str, email: str, message: str = "change") -> None:
+    """Commit everything in `repo` (creating a file first) as `email` on `day`"""
+    import subprocess
+
+    (repo / f"file-{email}.txt").open("a").write(f"{day} {message}\n")
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_DATE=f"{day}T12:00:00", GIT_COMMITTER_DATE=f"{day}T12:00:00",
+        GIT_AUTHOR_NAME=email, GIT_AUTHOR_EMAIL=email, GIT_COMMITTER_NAME=email, GIT_COMMITTER_EMAIL=email,
+    )
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True, env=env)
+    subprocess.run(["git", "commit", "-q", "-m", message], cwd=repo, check=True, env=env)
+
+
+def make_repo(path, commits) -> str:
+    """Create a git repo at `path` with (day, author email) commits"""
+    import subprocess
+
+    path.mkdir(parents=True)
+    subprocess.run(["git", "init", "-q"], cwd=path, check=True)
+    for day, email in commits:
+        git_commit(path, day, email)
+    return str(path)
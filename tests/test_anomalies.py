@@ -0,0 +1,79 @@
+import pytest
+
+from anomalies import AnomalyDetector
+
+
+def _snapshot(period_end: str, commits: float, is_baseline: bool = False, status: str = "complete") -> dict:
+    return {
+        "period_end": period_end,
+        "is_baseline": is_baseline,
+        "productivity": {"commits": commits},
+        "field_status": {"productivity.commits": {"status": status}},
+    }
+
+
+def _feed(detector: AnomalyDetector, values) -> list[dict]:
+    return [
+        detector.observe(_snapshot(f"2024-{month:02d}-01", value))["productivity.commits"]
+        for month, value in enumerate(values, 1)
+    ]
+
+
+def test_ewma_mean_and_variance_update():
+    detector = AnomalyDetector(alpha=0.5)
+    _feed(detector, [10.0])
+    assert detector.state["metrics"]["productivity.commits"] == {"mean": 10.0, "var": 0.0, "n": 1}
+
+    # Re-running the same period scores it without folding it in again
+    assert detector.observe(_snapshot("2024-01-01", 0.0))["productivity.commits"]["expected"] == 10.0
+    assert detector.state["metrics"]["productivity.commits"]["n"] == 1
+
+    detector.observe(_snapshot("2024-02-01", 20.0))
+    # diff 10: mean 10 + 0.5 * 10, var (1 - 0.5) * (0 + 10 * 5)
+    assert detector.state["metrics"]["productivity.commits"] == {"mean": 15.0, "var": 25.0, "n": 2}
+
+    detector.observe(_snapshot("2024-03-01", 5.0))
+    # diff -10: mean 15 - 5, var 0.5 * (25 + 50)
+    assert detector.state["metrics"]["productivity.commits"] == {"mean": 10.0, "var": 37.5, "n": 3}
+
+
+def test_no_alert_during_warm_up():
+    detector = AnomalyDetector(warmup=3)
+    scores = _feed(detector, [10.0, 10.0, 10.0, 100.0])
+    assert scores[0]["expected"] is None
+    # The flat history makes 100 extreme either way, but only after 3 observations
+    assert not any(score["significant"] for score in scores[:3])
+    assert scores[3]["significant"] and scores[3]["direction"] == "up"
+
+    early = AnomalyDetector(warmup=3)
+    scores = _feed(early, [10.0, 10.0, 100.0])
+    assert scores[2]["z"] > early.threshold
+    assert not scores[2]["significant"]
+
+
+@pytest.mark.parametrize("threshold, significant", [(2.0, True), (3.0, False)])
+def test_threshold(threshold, significant):
+    detector = AnomalyDetector(alpha=0.5, warmup=1, threshold=threshold)
+    detector.state["metrics"]["productivity.commits"] = {"mean": 10.0, "var": 4.0, "n": 5}
+    # std 2, so 15 is z = 2.5
+    score = detector.score("productivity.commits", 15.0)
+    assert score["z"] == 2.5
+    assert score["significant"] is significant
+    assert score["is_improvement"] is True
+    assert detector.score("quality.bug_count", 1.0)["significant"] is False
+
+
+def test_baseline_and_incomplete_snapshots_do_not_move_the_state():
+    detector = AnomalyDetector()
+    _feed(detector, [10.0, 12.0])
+    before = {k: dict(v) for k, v in detector.state["metrics"].items()}
+
+    # A baseline is scored against the trend but never becomes part of it
+    scores = detector.observe(_snapshot("2024-06-01", 500.0, is_baseline=True))
+    assert scores["productivity.commits"]["expected"] is not None
+    assert detector.state["metrics"] == before
+    assert detector.state["last_period_end"] == "2024-02-01"
+
+    # Partial or missing fields are neither scored nor folded in
+    assert detector.observe(_snapshot("2024-07-01", 500.0, status="partial")) == {}
+    assert detector.state["metrics"] == before
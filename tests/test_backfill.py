@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
+
+from collect_metrics import COMPLETE, PARTIAL, MetricsCollector
+from conftest import make_repo
+
+TODAY = date.today()
+
+
+def _pr(number: int, days_ago: int) -> dict:
+    day = f"{(TODAY - timedelta(days=days_ago)).isoformat()}T12:00:00Z"
+    return {"number": number, "user": {"login": "dev"}, "created_at": day, "merged_at": day, "updated_at": day}
+
+
+def _collector(monkeypatch, prs, fail_page=None):
+    collector = MetricsCollector(
+        [], hook_log_path="/nonexistent/blocks.log", cache_dir=None, github_token="t", github_org="org"
+    )
+    pages = []
+
+    def request(endpoint):
+        if endpoint.startswith("/orgs/"):
+            return [{"name": "api"}]
+        page = int(parse_qs(urlparse(endpoint).query)["page"][0])
+        pages.append(page)
+        if page == fail_page:
+            return None
+        return prs[(page - 1) * 100:page * 100]
+
+    monkeypatch.setattr(collector, "_github_request", request)
+    return collector, pages
+
+
+def test_closed_prs_are_paged_back_to_the_range_start(monkeypatch):
+    # One merged PR a day, newest first, for 350 days
+    prs = [_pr(i, i) for i in range(350)]
+    collector, pages = _collector(monkeypatch, prs)
+    partials = collector.collect_backfill(TODAY - timedelta(days=150), TODAY)
+
+    # Page 2 ends 199 days ago, before the range, so page 3 is never fetched
+    assert pages == [1, 2]
+    start = min(date.fromisoformat(p.period_start[:10]) for p in partials.values())
+    assert sum(p.prs_merged for p in partials.values()) == (TODAY - start).days + 1
+    assert collector._source_status["pull_requests"]["status"] == COMPLETE
+
+
+def test_failed_page_marks_pull_requests_partial(monkeypatch):
+    collector, pages = _collector(monkeypatch, [_pr(i, i) for i in range(350)], fail_page=2)
+    partials = collector.collect_backfill(TODAY - timedelta(days=150), TODAY)
+
+    assert pages == [1, 2]
+    assert sum(p.prs_merged for p in partials.values()) == 100
+    assert collector._source_status["pull_requests"]["status"] == PARTIAL
+
+
+def test_project_team_size_counts_the_backfilled_period(tmp_path):
+    # Inside the default 30-day --months window, but before the current week
+    repo = make_repo(tmp_path / "repo", [
+        ((TODAY - timedelta(days=10)).isoformat(), "old@x"),
+        (TODAY.isoformat(), "new@x"),
+    ])
+    collector = MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=None)
+    partials = collector.collect_backfill(TODAY - timedelta(days=14), TODAY, bucket="week")
+
+    current = next(p for p in partials.values() if p.projects)
+    assert current.period_start[:10] <= TODAY.isoformat() < current.period_end[:10]
+    assert [row["team_size"] for row in current.projects] == [1]
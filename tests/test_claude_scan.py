@@ -0,0 +1,61 @@
+import os
+
+from collect_metrics import scan_claude_dir
+
+
+def _claude(tmp_path):
+    claude = tmp_path / ".claude"
+    (claude / "learnings").mkdir(parents=True)
+    (claude / "learnings" / "retries.md").write_text("---\ndate: 2024-01-01\n---\n# Retries\n")
+    (claude / "learnings" / ".gitkeep").write_text("")
+    (claude / "learnings" / "TEMPLATE.md").write_text("# Template\n")
+    (claude / "CLAUDE.md").write_text("# Project\n")
+    return claude
+
+
+def test_only_knowledge_dirs_are_listed(tmp_path):
+    claude = _claude(tmp_path)
+    (claude / "commands").mkdir()
+    (claude / "commands" / "review.md").write_text("# Review\n")
+    (claude / "learnings" / "archive").mkdir()
+    (claude / "learnings" / "archive" / "old.md").write_text("# Old\n")
+
+    inventory = scan_claude_dir(str(tmp_path))
+    assert inventory.exists and inventory.has_claude_md and not inventory.truncated
+    assert sorted(inventory.dirs) == ["learnings"]
+    assert sorted(f.name for f in inventory.dirs["learnings"]) == [".gitkeep", "TEMPLATE.md", "retries.md"]
+    assert [f.name for f in inventory.files("learnings")] == ["retries.md"]
+    assert inventory.files("patterns") == []
+
+
+def test_missing_claude_dir(tmp_path):
+    inventory = scan_claude_dir(str(tmp_path))
+    assert not inventory.exists and not inventory.has_claude_md and inventory.dirs == {}
+
+
+def test_symlink_loops_and_dangling_links_are_skipped(tmp_path):
+    claude = _claude(tmp_path)
+    learnings = claude / "learnings"
+    os.symlink(claude, learnings / "parent")
+    os.symlink(learnings / "loop-b", learnings / "loop-a")
+    os.symlink(learnings / "loop-a", learnings / "loop-b")
+    os.symlink(tmp_path / "missing.md", learnings / "dangling.md")
+    os.symlink(learnings / "retries.md", learnings / "alias.md")
+    os.symlink(learnings, claude / "patterns")
+
+    inventory = scan_claude_dir(str(tmp_path))
+    assert [f.name for f in sorted(inventory.files("learnings"), key=lambda f: f.name)] == ["alias.md", "retries.md"]
+    # A symlinked knowledge dir is listed once, not followed any deeper
+    assert sorted(f.name for f in inventory.files("patterns")) == ["alias.md", "retries.md"]
+
+
+def test_files_are_stat_only(tmp_path, monkeypatch):
+    _claude(tmp_path)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("scan read a file")
+
+    monkeypatch.setattr("builtins.open", no_open)
+    files = scan_claude_dir(str(tmp_path)).files("learnings")
+    assert files[0].size == len("---\ndate: 2024-01-01\n---\n# Retries\n")
+    assert files[0].mtime > 0
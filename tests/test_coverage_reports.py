@@ -0,0 +1,94 @@
+import json
+
+from coverage_reports import (
+    find_coverage_reports,
+    parse_cobertura,
+    parse_coverage_file,
+    parse_coverage_py_json,
+    parse_lcov,
+)
+
+COBERTURA_NO_TOTALS = """<?xml version="1.0" ?>
+<coverage version="5.5">
+  <packages>
+    <package name="app">
+      <classes>
+        <class name="a.py" filename="app/a.py">
+          <methods>
+            <method name="f" signature="()">
+              <lines>
+                <line number="1" hits="1"/>
+                <line number="2" hits="0"/>
+              </lines>
+            </method>
+          </methods>
+          <lines>
+            <line number="1" hits="1"/>
+            <line number="2" hits="0"/>
+            <line number="3" hits="1"/>
+          </lines>
+        </class>
+        <class name="b.py" filename="app/b.py">
+          <methods/>
+          <lines>
+            <line number="1" hits="4"/>
+            <line number="2" hits="0" branch="true" condition-coverage="50% (1/2)"/>
+          </lines>
+        </class>
+      </classes>
+    </package>
+  </packages>
+</coverage>
+"""
+
+
+def test_cobertura_counts_class_lines_once(tmp_path):
+    path = tmp_path / "coverage.xml"
+    path.write_text(COBERTURA_NO_TOTALS)
+    assert parse_cobertura(str(path)) == (3, 5)
+
+
+def test_cobertura_uses_root_totals(tmp_path):
+    path = tmp_path / "coverage.xml"
+    path.write_text('<coverage lines-valid="200" lines-covered="150"><packages/></coverage>')
+    assert parse_cobertura(str(path)) == (150, 200)
+
+
+def test_cobertura_malformed_returns_none(tmp_path):
+    path = tmp_path / "coverage.xml"
+    path.write_text("<coverage><packages>")
+    assert parse_cobertura(str(path)) is None
+
+
+def test_lcov_sums_records(tmp_path):
+    path = tmp_path / "lcov.info"
+    path.write_text(
+        "TN:\nSF:src/a.js\nDA:1,1\nDA:2,0\nLF:2\nLH:1\nend_of_record\n"
+        "SF:src/b.js\nDA:1,3\nLF:10\nLH:7\nend_of_record\n"
+    )
+    assert parse_lcov(str(path)) == (8, 12)
+
+
+def test_coverage_py_json_reads_totals_from_tail(tmp_path):
+    report = {
+        "meta": {"version": "7.4.0"},
+        "files": {f"pkg/m{i}.py": {"summary": {"covered_lines": 1, "num_statements": 2}} for i in range(2000)},
+        "totals": {"covered_lines": 2000, "num_statements": 4000, "percent_covered": 50.0},
+    }
+    path = tmp_path / "coverage.json"
+    path.write_text(json.dumps(report))
+    assert parse_coverage_py_json(str(path)) == (2000, 4000)
+    assert parse_coverage_file(str(path)) == (2000, 4000)
+
+
+def test_coverage_py_json_without_totals(tmp_path):
+    path = tmp_path / "coverage.json"
+    path.write_text('{"files": {}}')
+    assert parse_coverage_py_json(str(path)) is None
+
+
+def test_find_reports_uses_first_matching_pattern(tmp_path):
+    (tmp_path / "coverage").mkdir()
+    (tmp_path / "coverage" / "lcov.info").write_text("LF:1\nLH:1\n")
+    (tmp_path / "coverage.json").write_text("{}")
+    assert find_coverage_reports(str(tmp_path)) == [str(tmp_path / "coverage" / "lcov.info")]
@@ -0,0 +1,64 @@
+from collect_metrics import PARTIAL, Deadline, HookLogIndex, MetricsCollector, scan_claude_dir
+from conftest import make_repo
+from coverage_reports import parse_lcov
+from issue_exports import IssueIndex
+
+
+def stop() -> bool:
+    return True
+
+
+def test_issue_index_stop_keeps_cached_files(tmp_path):
+    for name in ("a.csv", "b.csv"):
+        (tmp_path / name).write_text(f"Issue key,Issue Type,Created\n{name}-1,Bug,2024-01-01\n")
+    index = IssueIndex()
+    index.update(str(tmp_path))
+    cached = dict(index.data["files"])
+
+    (tmp_path / "a.csv").unlink()
+    index.update(str(tmp_path), should_stop=stop)
+    assert index.stopped
+    # Not every file was seen, so nothing may be purged
+    assert index.data["files"] == cached
+
+
+def test_lcov_stop_returns_none(tmp_path):
+    path = tmp_path / "lcov.info"
+    path.write_text("SF:a.js\nLH:1\nLF:2\nend_of_record\n" * 5000)
+    assert parse_lcov(str(path)) == (5000, 10000)
+    assert parse_lcov(str(path), should_stop=stop) is None
+
+
+def test_hook_index_stop_saves_progress(tmp_path):
+    log = tmp_path / "blocks.log"
+    log.write_text('{"ts": "2024-01-01T10:00:00", "code": "secret", "user": "dev", "repo": "api"}\n' * 25_000)
+
+    index = HookLogIndex(str(log)).update(should_stop=stop)
+    assert index.stopped
+    assert 0 < index.data["indexed_bytes"] < log.stat().st_size
+
+    # The next run resumes where the stopped one left off
+    assert not HookLogIndex(str(log)).update().stopped
+
+
+def test_claude_scan_stop_is_truncated(tmp_path):
+    (tmp_path / ".claude" / "learnings").mkdir(parents=True)
+    (tmp_path / ".claude" / "learnings" / "one.md").write_text("# One\n")
+    assert not scan_claude_dir(str(tmp_path)).truncated
+    assert scan_claude_dir(str(tmp_path), should_stop=stop).truncated
+
+
+def test_expired_budget_runs_no_git_for_adoption(tmp_path, monkeypatch):
+    repo = make_repo(tmp_path / "repo", [("2024-01-01", "dev@x")])
+    collector = MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=None)
+    collector._budget = Deadline(0)
+
+    def no_git(*args, **kwargs):
+        raise AssertionError("git ran after the deadline")
+
+    monkeypatch.setattr("subprocess.run", no_git)
+    monkeypatch.setattr("subprocess.Popen", no_git)
+
+    row = collector._project_row(repo, collector._get_inventory(repo, "adoption"))
+    assert row.team_size == 0
+    assert collector._source_status["adoption"]["status"] == PARTIAL
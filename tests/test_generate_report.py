@@ -0,0 +1,135 @@
+import json
+import os
+from dataclasses import asdict
+
+import pytest
+
+from collect_metrics import PartialMetrics
+from generate_report import ReportGenerator, load_batch_manifest, run_batch
+
+
+def _snapshot(prs_cycle_hours: float, anomalies=None) -> dict:
+    partial = PartialMetrics(
+        collected_at="2026-10-01T00:00:00", period_start="2026-09-01T00:00:00",
+        period_end="2026-10-01T00:00:00", is_baseline=False, months=1,
+    )
+    partial.pr_cycle_seconds_total = int(prs_cycle_hours * 3600)
+    partial.pr_cycle_count = 1
+    data = asdict(partial.finalize())
+    data["anomalies"] = anomalies or {}
+    return data
+
+
+def _key_metric_row(report: str, label: str) -> str:
+    return next(line for line in report.splitlines() if line.startswith(f"| {label} |"))
+
+
+def test_baseline_delta_keeps_improvement_regression_colors():
+    # 5% slower than baseline: a regression, red even though it is small
+    report = ReportGenerator.from_snapshots(_snapshot(10.5), baseline=_snapshot(10.0)).generate_report()
+    assert _key_metric_row(report, "PR Cycle Time") == "| PR Cycle Time | 10.5h | 🔴 ↑5.0% |"
+
+
+def test_trend_significance_has_its_own_column():
+    anomalies = {"productivity.pr_cycle_time_hours": {
+        "value": 5.0, "expected": 3.0, "z": 4.2, "significant": True, "direction": "up", "is_improvement": False,
+    }}
+    # Faster than baseline (green) but unusually slow against the recent trend (red)
+    report = ReportGenerator.from_snapshots(_snapshot(5.0, anomalies), baseline=_snapshot(8.0)).generate_report()
+
+    assert "| Metric | Current | vs Baseline | vs Trend |" in report
+    assert _key_metric_row(report, "PR Cycle Time") == "| PR Cycle Time | 5.0h | 🟢 ↓37.5% | 🔴 unusual (z +4.2) |"
+    assert "### Significant Changes" in report
+    assert "Investigate productivity.pr_cycle_time_hours" in report
+
+
+def test_insignificant_trend_does_not_hide_baseline_change():
+    anomalies = {"productivity.pr_cycle_time_hours": {
+        "value": 20.0, "expected": 19.0, "z": 0.5, "significant": False, "direction": "up", "is_improvement": False,
+    }}
+    report = ReportGenerator.from_snapshots(_snapshot(20.0, anomalies), baseline=_snapshot(10.0)).generate_report()
+    assert _key_metric_row(report, "PR Cycle Time") == "| PR Cycle Time | 20.0h | 🔴 ↑100.0% | normal |"
+    assert "### Significant Changes" not in report
+
+
+def test_dashboard_summary_carries_every_card(tmp_path):
+    current = _snapshot(4.0)
+    current["productivity"]["active_developers"] = 42
+    generator = ReportGenerator.from_snapshots(current, baseline=_snapshot(8.0))
+    manifest = generator.publish_dashboard(str(tmp_path))
+
+    with open(manifest) as f:
+        summary_file = json.load(f)["summary"]
+    with open(tmp_path / summary_file) as f:
+        summary = json.load(f)
+
+    assert summary["roi"]["monthly_value"] == 42 * 4 * 4 * 75
+    assert "$50,400" in generator.generate_report()
+    cycle = next(d for d in summary["vs_baseline"] if d["name"] == "pr_cycle_time_hours")
+    assert (cycle["previous"], cycle["delta_percent"], cycle["is_improvement"]) == (8.0, -50.0, True)
+
+
+def _write(path, data) -> str:
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_batch_manifest_is_validated(tmp_path):
+    with pytest.raises(ValueError, match="needs 'current' and 'output'"):
+        load_batch_manifest(_write(tmp_path / "m.json", [{"current": "a.json"}]))
+    with pytest.raises(ValueError, match="unknown formats: pdf"):
+        load_batch_manifest(_write(tmp_path / "m.json", [{"current": "a.json", "output": "a", "formats": ["pdf"]}]))
+    with pytest.raises(ValueError, match="list of jobs"):
+        load_batch_manifest(_write(tmp_path / "m.json", {"jobs": "a.json"}))
+    with pytest.raises(ValueError, match="not an object"):
+        load_batch_manifest(_write(tmp_path / "m.json", ["a.json"]))
+
+    # Relative paths resolve against the manifest, not the working directory
+    (tmp_path / "sub").mkdir()
+    jobs = load_batch_manifest(_write(tmp_path / "sub" / "m.json", {"jobs": [
+        {"current": "cur.json", "baseline": "/abs/base.json", "output": "out/team"},
+    ]}))
+    assert jobs == [{
+        "name": "out/team",
+        "current": str(tmp_path / "sub" / "cur.json"),
+        "baseline": "/abs/base.json",
+        "previous": None,
+        "formats": ["markdown"],
+        "output": str(tmp_path / "sub" / "out" / "team"),
+    }]
+
+
+def test_batch_writes_one_file_per_format(tmp_path, capsys):
+    _write(tmp_path / "current.json", _snapshot(4.0))
+    _write(tmp_path / "baseline.json", _snapshot(8.0))
+    manifest = _write(tmp_path / "batch.json", [
+        {"current": "current.json", "baseline": "baseline.json", "output": "reports/a", "formats": ["markdown", "json"]},
+        {"name": "b", "current": "current.json", "output": "reports/b", "formats": ["html"]},
+    ])
+
+    assert run_batch(manifest, workers=8) == 0
+    assert sorted(os.listdir(tmp_path / "reports")) == ["a.json", "a.md", "b.html"]
+    assert "PR Cycle Time" in (tmp_path / "reports" / "a.md").read_text()
+    summary = capsys.readouterr().out
+    # Two jobs never need more than two workers
+    assert "Batch: 2 jobs, 3 reports, 0 failed" in summary
+    assert "2 workers" in summary
+
+
+def test_batch_failures_are_summarized(tmp_path, capsys):
+    _write(tmp_path / "current.json", _snapshot(4.0))
+    (tmp_path / "broken.json").write_text("{not json")
+    manifest = _write(tmp_path / "batch.json", [
+        {"name": "ok", "current": "current.json", "output": "ok"},
+        {"name": "missing", "current": "nope.json", "output": "missing"},
+        {"name": "broken", "current": "current.json", "baseline": "broken.json", "output": "broken"},
+    ])
+
+    assert run_batch(manifest, workers=1) == 1
+    out = capsys.readouterr().out
+    assert "Batch: 3 jobs, 1 reports, 2 failed" in out
+    assert "1 worker)" in out
+    failures = out.split("Failures:\n")[1].splitlines()
+    assert failures[0].startswith(f"  broken: Cannot load {tmp_path / 'broken.json'}")
+    assert failures[1].startswith(f"  missing: Cannot load {tmp_path / 'nope.json'}")
+    assert sorted(os.listdir(tmp_path)) == ["batch.json", "broken.json", "current.json", "ok.md"]
@@ -0,0 +1,91 @@
+import json
+import os
+
+from collect_metrics import HookLogIndex, MetricsCollector, default_hook_log_path, parse_hook_record
+
+
+def _v2(day: str, code: str, user: str = "dev", repo: str = "api") -> str:
+    return json.dumps({"ts": f"{day}T10:00:00", "code": code, "user": user, "repo": repo}) + "\n"
+
+
+def test_v1_and_v2_lines_are_parsed():
+    v2 = parse_hook_record(_v2("2024-01-02", "PII_EXPOSED", user="ana", repo="web"))
+    assert v2 == {
+        "ts": "2024-01-02T10:00:00", "day": "2024-01-02", "code": "PII_EXPOSED",
+        "repo": "web", "user": "ana", "file": None,
+    }
+
+    v1 = parse_hook_record("2024-01-03T09:00:00,bob,secret_detected\n")
+    assert v1["code"] == "SECRET_BLOCKED"
+    assert (v1["day"], v1["user"], v1["repo"]) == ("2024-01-03", "bob", "")
+    assert parse_hook_record("1704268800,bob,PII exposed")["code"] == "PII_EXPOSED"
+    assert parse_hook_record("2024-01-03,bob,PII warning")["code"] == "PII_WARNING"
+
+    for line in ("", "not,enough", "2024-01-03,bob,unrelated", "{broken json", '{"ts": "2024-01-03"}'):
+        assert parse_hook_record(line) is None
+
+
+def test_update_resumes_from_the_indexed_offset(tmp_path, monkeypatch):
+    log = tmp_path / "blocks.log"
+    log.write_text(_v2("2024-01-01", "SECRET_BLOCKED") + "2024-01-01T11:00:00,bob,antipattern\n")
+
+    index = HookLogIndex(str(log)).update()
+    assert index.data["indexed_bytes"] == log.stat().st_size
+    assert index.counts("2024-01-01") == {"SECRET_BLOCKED": 1, "ANTIPATTERN_WARNING": 1}
+    assert index.counts("2024-01-01", user="bob") == {"ANTIPATTERN_WARNING": 1}
+
+    # Only the appended bytes are parsed on the next run; a half-written
+    # line is left for later
+    first_size = log.stat().st_size
+    with open(log, "a") as f:
+        f.write(_v2("2024-01-02", "PII_WARNING", repo="web"))
+        f.write('{"ts": "2024-01-02T12:00')
+    parsed = []
+    monkeypatch.setattr("collect_metrics.parse_hook_record", lambda line: parsed.append(line) or parse_hook_record(line))
+
+    index = HookLogIndex(str(log)).update()
+    assert len(parsed) == 1
+    assert first_size < index.data["indexed_bytes"] < log.stat().st_size
+    assert index.counts("2024-01-01") == {"SECRET_BLOCKED": 1, "ANTIPATTERN_WARNING": 1, "PII_WARNING": 1}
+    assert index.counts("2024-01-02", repo="web") == {"PII_WARNING": 1}
+    assert [r["code"] for r in index.iter_records("2024-01-02")] == ["PII_WARNING"]
+
+    # Nothing new: the log is not read at all
+    parsed.clear()
+    HookLogIndex(str(log)).update()
+    assert parsed == []
+
+
+def test_truncated_log_resets_the_index(tmp_path):
+    log = tmp_path / "blocks.log"
+    log.write_text(_v2("2024-01-01", "SECRET_BLOCKED") * 3)
+    HookLogIndex(str(log)).update()
+
+    log.write_text(_v2("2024-02-01", "PII_WARNING"))
+    index = HookLogIndex(str(log)).update()
+    assert index.data["indexed_bytes"] == log.stat().st_size
+    assert dict(index.daily_counts()) == {"2024-02-01": {"PII_WARNING": 1}}
+
+
+def test_rotated_log_resets_the_index(tmp_path):
+    log = tmp_path / "blocks.log"
+    log.write_text(_v2("2024-01-01", "SECRET_BLOCKED"))
+    HookLogIndex(str(log)).update()
+
+    # logrotate-style: a new file (new inode) at least as large as the old one
+    rotated = tmp_path / "blocks.log.new"
+    rotated.write_text(_v2("2024-02-01", "DANGEROUS_FILE_BLOCKED") * 2)
+    os.replace(rotated, log)
+    index = HookLogIndex(str(log)).update()
+    assert dict(index.daily_counts()) == {"2024-02-01": {"DANGEROUS_FILE_BLOCKED": 2}}
+
+
+def test_collector_uses_the_hook_writer_log_path(tmp_path, monkeypatch):
+    log = tmp_path / "custom.log"
+    monkeypatch.setenv("CLAUDE_METRICS_HOOK_LOG", str(log))
+    assert default_hook_log_path() == str(log)
+    assert MetricsCollector([], cache_dir=None).hook_log_path == str(log)
+    assert MetricsCollector([], hook_log_path="/explicit.log", cache_dir=None).hook_log_path == "/explicit.log"
+
+    monkeypatch.delenv("CLAUDE_METRICS_HOOK_LOG")
+    assert default_hook_log_path() == os.path.expanduser("~/.claude-metrics/blocks.log")
@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+from datetime import date, timedelta
+
+from collect_metrics import MetricsCollector
+from issue_exports import IssueIndex, iter_export_records
+
+RECENT = (date.today() - timedelta(days=3)).isoformat()
+
+
+def _write_csv(path, rows, header="Issue key,Issue Type,Created,Resolved"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join([header] + rows) + "\n")
+
+
+def _quality(export_dir, cache_dir):
+    collector = MetricsCollector(
+        [], hook_log_path="/nonexistent/blocks.log", cache_dir=str(cache_dir), issue_export_dir=str(export_dir)
+    )
+    return collector.collect_partial().finalize().quality
+
+
+def test_export_directories_do_not_share_state(tmp_path):
+    cache = tmp_path / "cache"
+    _write_csv(tmp_path / "a" / "issues.csv", [f"A-1,Bug,{RECENT},{RECENT}", f"A-2,Bug,{RECENT},"])
+    _write_csv(tmp_path / "a" / "changes.csv", [f"A-1,status,{RECENT},Done,In Progress"],
+               header="Issue key,Field,Date,From,To")
+    _write_csv(tmp_path / "b" / "issues.csv", [f"B-1,Bug,{RECENT},{RECENT}"])
+
+    first = _quality(tmp_path / "a", cache)
+    assert first.bug_count == 2
+    assert first.bug_reopen_rate == 100.0
+
+    second = _quality(tmp_path / "b", cache)
+    assert second.bug_count == 1
+    assert second.bug_reopen_rate == 0.0
+
+    # Back to A: served from its own cache entry, unchanged
+    assert _quality(tmp_path / "a", cache).bug_count == 2
+
+
+def test_deleted_and_rewritten_files_are_purged(tmp_path):
+    export = tmp_path / "export"
+    _write_csv(export / "one.csv", [f"X-1,Bug,{RECENT},", f"X-2,Bug,{RECENT},"])
+    _write_csv(export / "two.csv", [f"X-3,Bug,{RECENT},"])
+
+    index = IssueIndex()
+    assert index.update(str(export)) == 2
+    assert index.bug_totals(RECENT)[0] == 3
+
+    os.remove(export / "two.csv")
+    # Re-triaged: X-2 is no longer a bug
+    _write_csv(export / "one.csv", [f"X-1,Bug,{RECENT},", f"X-2,Task,{RECENT},"])
+    os.utime(export / "one.csv", (1, 1))
+
+    restored = IssueIndex(json.loads(json.dumps(index.data)))
+    assert restored.update(str(export)) == 2
+    assert restored.bug_totals(RECENT)[0] == 1
+    assert restored.update(str(export)) == 0
+
+
+def test_newer_export_overrides_bug_flag(tmp_path):
+    export = tmp_path / "export"
+    _write_csv(export / "old.csv", [f"X-1,Bug,{RECENT},"])
+    _write_csv(export / "new.csv", [f"X-1,Story,{RECENT},"])
+    os.utime(export / "old.csv", (1000, 1000))
+    os.utime(export / "new.csv", (2000, 2000))
+
+    index = IssueIndex()
+    index.update(str(export))
+    assert index.issues()["X-1"]["bug"] is False
+
+
+def test_csv_with_huge_field_is_read(tmp_path):
+    path = tmp_path / "export" / "jira.csv"
+    description = "x" * 300_000
+    _write_csv(path, [f'X-1,Bug,{RECENT},,"{description}"'], header="Issue key,Issue Type,Created,Resolved,Description")
+
+    index = IssueIndex()
+    index.update(str(path.parent))
+    assert not index.errors
+    assert index.bug_totals(RECENT)[0] == 1
+
+
+def test_json_and_jsonl_exports(tmp_path):
+    jira = {"issues": [{
+        "key": "J-1",
+        "fields": {"issuetype": {"name": "Bug"}, "labels": [], "created": f"{RECENT}T10:00:00.000+0000"},
+        "changelog": {"histories": [{"created": f"{RECENT}T11:00:00.000+0000",
+                                     "items": [{"field": "status", "fromString": "Open", "toString": "Done"}]}]},
+    }]}
+    linear = {"identifier": "L-1", "labels": {"nodes": [{"name": "bug"}]}, "createdAt": f"{RECENT}T09:00:00Z",
+              "history": {"nodes": [{"createdAt": f"{RECENT}T12:00:00Z",
+                                     "fromState": {"name": "Done"}, "toState": {"name": "Todo"}}]}}
+    (tmp_path / "jira.json").write_text(json.dumps(jira))
+    with gzip.open(tmp_path / "linear.jsonl.gz", "wt") as f:
+        f.write(json.dumps(linear) + "\n")
+
+    kinds = [(r["key"], r["kind"]) for r in iter_export_records(str(tmp_path / "jira.json"))]
+    assert kinds == [("J-1", "issue"), ("J-1", "transition")]
+
+    index = IssueIndex()
+    index.update(str(tmp_path))
+    assert index.bug_totals(RECENT) == (2, 1, 1)
+
+
+def test_truncated_and_corrupt_gzip_exports_are_skipped(tmp_path):
+    rows = "\n".join(["Issue key,Issue Type,Created"] + [f"G-{i},Bug,{RECENT}" for i in range(2000)]) + "\n"
+    body = gzip.compress(rows.encode())
+    # Half-synced: the gzip stream ends early (EOFError)
+    (tmp_path / "truncated.csv.gz").write_bytes(body[:len(body) // 2])
+    # Damaged deflate data (zlib.error)
+    (tmp_path / "corrupt.csv.gz").write_bytes(body[:10] + b"\xff" * 64 + body[74:])
+    _write_csv(tmp_path / "good.csv", [f"OK-1,Bug,{RECENT}"])
+
+    index = IssueIndex()
+    index.update(str(tmp_path))
+    assert sorted(os.path.basename(e.split(":")[0]) for e in index.errors) == ["corrupt.csv.gz", "truncated.csv.gz"]
+    assert index.bug_totals(RECENT)[0] == 1
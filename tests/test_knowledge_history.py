@@ -0,0 +1,49 @@
+from collect_metrics import parse_knowledge_log
+
+
+def _parse(*commits):
+    lines = []
+    for day, changes in commits:
+        lines.append(f"@{day}")
+        lines.extend(changes)
+    return parse_knowledge_log(lines)
+
+
+def test_rename_into_patterns_is_one_promotion():
+    days = _parse(("2024-01-02", ["R100\t.claude/learnings/a.md\t.claude/patterns/a.md"]))
+    assert days["2024-01-02"] == {
+        "learnings_added": 0, "patterns_added": 1, "patterns_promoted": 1, "failures_added": 0, "knowledge_removed": 0,
+    }
+
+
+def test_delete_learning_and_add_pattern_in_one_commit_is_a_promotion():
+    days = _parse(("2024-01-02", ["D\t.claude/learnings/a.md", "A\t.claude/patterns/retry.md"]))
+    assert days["2024-01-02"]["patterns_promoted"] == 1
+    assert days["2024-01-02"]["knowledge_removed"] == 0
+
+
+def test_rename_plus_unrelated_delete_is_not_promoted_twice():
+    days = _parse(("2024-01-02", [
+        "R100\t.claude/learnings/a.md\t.claude/patterns/a.md",
+        "D\t.claude/learnings/b.md",
+    ]))
+    assert days["2024-01-02"]["patterns_promoted"] == 1
+    assert days["2024-01-02"]["knowledge_removed"] == 1
+
+
+def test_mixed_commits_on_one_day():
+    days = _parse(
+        ("2024-01-03", [
+            "A\t.claude/learnings/new.md",
+            "A\t.claude/failures/oops.md",
+            "A\t.claude/learnings/TEMPLATE.md",
+            "M\t.claude/patterns/old.md",
+            "R090\t.claude/learnings/x.md\t.claude/learnings/y.md",
+        ]),
+        # Deletion and addition in different commits are not paired
+        ("2024-01-03", ["D\t.claude/learnings/gone.md"]),
+        ("2024-01-03", ["A\t.claude/patterns/p.md", "D\t.claude/failures/f.md"]),
+    )
+    assert days["2024-01-03"] == {
+        "learnings_added": 1, "patterns_added": 1, "patterns_promoted": 0, "failures_added": 1, "knowledge_removed": 2,
+    }
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from collect_metrics import MetricsCollector
+from knowledge_index import KnowledgeIndex, default_index_path
+
+
+@pytest.fixture
+def repo(tmp_path):
+    claude = tmp_path / "repo" / ".claude"
+    for subdir in ("learnings", "patterns"):
+        (claude / subdir).mkdir(parents=True)
+        (claude / subdir / ".gitkeep").write_text("")
+        (claude / subdir / "TEMPLATE.md").write_text("# Template\n")
+    (claude / "learnings" / "retries.md").write_text("# Retries\nBack off on 429 responses.\n")
+    (claude / "patterns" / "logging.md").write_text("# Logging\nNever log student names.\n")
+    return str(tmp_path / "repo")
+
+
+def _collect(repo, cache_dir):
+    collector = MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=cache_dir)
+    return collector.collect_partial().finalize()
+
+
+def test_templates_are_excluded_everywhere(repo, tmp_path):
+    knowledge = _collect(repo, None).knowledge
+    assert knowledge.learnings_count == 1
+    assert knowledge.patterns_count == 1
+
+    index = KnowledgeIndex(repo, str(tmp_path / "index.json"))
+    index.update()
+    assert sorted(index.data["docs"]) == ["learnings/retries.md", "patterns/logging.md"]
+
+
+def test_index_is_read_from_the_collector_cache_dir(repo, tmp_path):
+    cache_dir = tmp_path / "cache"
+    KnowledgeIndex(repo, default_index_path(repo, str(cache_dir / "knowledge"))).update()
+
+    metrics = _collect(repo, str(cache_dir))
+    assert metrics.knowledge.indexed_documents == 2
+    assert metrics.knowledge.stale_documents == 0
+    assert metrics.field_status["knowledge.indexed_documents"]["status"] == "complete"
+
+
+def test_no_cache_skips_the_index(repo, tmp_path):
+    # An index in the default location must not be read when caching is off
+    KnowledgeIndex(repo).update()
+
+    metrics = _collect(repo, None)
+    assert metrics.knowledge.indexed_documents == 0
+    assert metrics.field_status["knowledge.indexed_documents"]["status"] == "missing"
+
+
+def _fresh(repo, tmp_path):
+    return KnowledgeIndex(repo, str(tmp_path / "index.json"))
+
+
+def test_bm25_ranks_denser_and_rarer_matches_first(repo, tmp_path):
+    failures = os.path.join(repo, ".claude", "failures")
+    os.makedirs(failures)
+    with open(os.path.join(failures, "retry-storm.md"), "w") as f:
+        f.write("# Retry storm\nRetry retry retry without jitter took the API down.\n")
+    with open(os.path.join(repo, ".claude", "learnings", "backoff.md"), "w") as f:
+        f.write("# Backoff\nRetry once after a 429, then give up and alert the on-call engineer.\n")
+    index = _fresh(repo, tmp_path)
+    index.update()
+
+    results = index.search("retry jitter")
+    assert [r["doc"] for r in results] == ["failures/retry-storm.md", "learnings/backoff.md"]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert results[0]["title"] == "Retry storm"
+    assert "jitter" in results[0]["snippet"]
+    assert index.search("nonexistentterm") == []
+
+
+def test_incremental_add_modify_touch_delete(repo, tmp_path, monkeypatch):
+    learnings = os.path.join(repo, ".claude", "learnings")
+    index = _fresh(repo, tmp_path)
+    assert index.update() == {"added": 2, "changed": 0, "removed": 0}
+
+    reads = []
+    real_open = open
+
+    def counting_open(path, *args, **kwargs):
+        if str(path).endswith(".md"):
+            reads.append(os.path.basename(path))
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+
+    # Unchanged: nothing is read
+    assert _fresh(repo, tmp_path).update() == {"added": 0, "changed": 0, "removed": 0}
+    assert reads == []
+
+    # Touched but not edited: hashed once, then the new mtime is saved
+    path = os.path.join(learnings, "retries.md")
+    os.utime(path, (1_000_000, 1_000_000))
+    _fresh(repo, tmp_path).update()
+    for _ in range(3):
+        assert _fresh(repo, tmp_path).update() == {"added": 0, "changed": 0, "removed": 0}
+    assert reads == ["retries.md"]
+    assert _fresh(repo, tmp_path).stats()["stale_documents"] == 0
+
+    # Edited, added and deleted files
+    with real_open(path, "a") as f:
+        f.write("Prefer idempotency keys.\n")
+    with real_open(os.path.join(learnings, "cache.md"), "w") as f:
+        f.write("# Cache\nInvalidate on write.\n")
+    os.remove(os.path.join(repo, ".claude", "patterns", "logging.md"))
+
+    index = _fresh(repo, tmp_path)
+    assert index.update() == {"added": 1, "changed": 1, "removed": 1}
+    assert sorted(index.data["docs"]) == ["learnings/cache.md", "learnings/retries.md"]
+    assert "logging" not in index.data["postings"]
+    assert [r["doc"] for r in index.search("idempotency")] == ["learnings/retries.md"]
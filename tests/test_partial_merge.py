@@ -0,0 +1,215 @@
+import json
+import os
+import subprocess
+from dataclasses import asdict
+from datetime import date, timedelta
+
+import pytest
+
+import collect_metrics
+from collect_metrics import PARTIAL, EventWriter, HookLogIndex, MetricsCollector, PartialMetrics
+from conftest import git_commit, make_repo
+from sketches import ExactCounter
+
+
+def _days_ago(n: int) -> str:
+    return (date.today() - timedelta(days=n)).isoformat()
+
+
+@pytest.fixture
+def repos(tmp_path):
+    # "shared" commits to every repo, so it is active in several shards
+    paths = []
+    for i in range(6):
+        commits = [(_days_ago(d), "shared@x") for d in range(1, 2 + i)]
+        commits += [(_days_ago(3), f"dev{i}@x")] * (i % 3 + 1)
+        paths.append(make_repo(tmp_path / f"repo{i}", commits))
+    return paths
+
+
+def _collect(repos, shard=None, distinct_mode="exact"):
+    collector = MetricsCollector(
+        repos, hook_log_path="/nonexistent/blocks.log", distinct_mode=distinct_mode, shard=shard
+    )
+    return collector.collect_partial()
+
+
+def _comparable(metrics) -> dict:
+    data = asdict(metrics)
+    for key in ("collected_at", "period_start", "period_end", "field_status", "anomalies"):
+        data.pop(key)
+    return data
+
+
+@pytest.mark.parametrize("distinct_mode", ["exact", "hll"])
+@pytest.mark.parametrize("shards", [2, 3])
+def test_merged_shards_match_single_node(repos, shards, distinct_mode):
+    single = _collect(repos, distinct_mode=distinct_mode).finalize()
+
+    partials = [_collect(repos, shard=(i, shards), distinct_mode=distinct_mode) for i in range(shards)]
+    assert sum(1 for p in partials if p.commits) >= 2, "fixture should spread repos over shards"
+
+    # Round-trip through the on-disk format, as the merge subcommand does
+    merged = PartialMetrics.from_dict(partials[0].to_dict())
+    for partial in partials[1:]:
+        merged.merge(PartialMetrics.from_dict(partial.to_dict()))
+    result = merged.finalize()
+
+    assert _comparable(result) == _comparable(single)
+    assert result.productivity.commits_per_dev_per_week_p50 is not None
+
+
+def test_developer_in_several_shards_is_counted_once(repos):
+    partials = [_collect(repos, shard=(i, 3)) for i in range(3)]
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged.merge(partial)
+
+    # 1+2+...+6 commits across all repos, attributed to one developer
+    assert merged.commit_activity["shared@x"] == 21
+    assert merged.finalize().productivity.active_developers == 7
+
+
+def test_merge_rejects_mismatched_periods():
+    a = PartialMetrics(collected_at="t", period_start="s", period_end="e", is_baseline=False, months=1)
+    b = PartialMetrics(collected_at="t", period_start="s", period_end="e", is_baseline=False, months=3)
+    with pytest.raises(ValueError):
+        a.merge(b)
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_commit_events_come_from_the_history_pass(repos, tmp_path, cache):
+    cache_dir = str(tmp_path / "cache") if cache else None
+    # Warm the cache first: a cache hit must not lose the events
+    MetricsCollector(repos, hook_log_path="/nonexistent/blocks.log", cache_dir=cache_dir).collect_partial()
+
+    path = tmp_path / "events.ndjson"
+    with EventWriter(str(path)) as events:
+        collector = MetricsCollector(
+            repos, hook_log_path="/nonexistent/blocks.log", cache_dir=cache_dir, events=events
+        )
+        partial = collector.collect_partial()
+
+    commits = [record for record in map(json.loads, path.read_text().splitlines()) if record["type"] == "commit"]
+    assert len(commits) == partial.commits == 33
+    assert len({(c["repo"], c["sha"]) for c in commits}) == 33
+
+
+def _git_logs(monkeypatch) -> list[list[str]]:
+    """Record the arguments of every streamed git log"""
+    calls = []
+    real_popen = subprocess.Popen
+
+    def popen(args, *rest, **kwargs):
+        if args[:2] == ["git", "log"]:
+            calls.append(args)
+        return real_popen(args, *rest, **kwargs)
+
+    monkeypatch.setattr("subprocess.Popen", popen)
+    return calls
+
+
+def test_cached_history_replays_only_the_event_window(tmp_path, monkeypatch):
+    repo = make_repo(tmp_path / "repo", [("2020-01-01", "old@x"), (_days_ago(2), "dev@x")])
+    cache_dir = str(tmp_path / "cache")
+    MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=cache_dir).collect_partial()
+    git_commit(tmp_path / "repo", _days_ago(1), "new@x")
+
+    calls = _git_logs(monkeypatch)
+    path = tmp_path / "events.ndjson"
+    with EventWriter(str(path)) as events:
+        MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=cache_dir, events=events).collect_partial()
+
+    # New commits are counted from head..cached; cached ones replayed from the window only
+    assert all(".." in call[2] or any(a.startswith("--since=") for a in call) for call in calls)
+    authors = sorted(r["author"] for r in map(json.loads, path.read_text().splitlines()) if r["type"] == "commit")
+    assert authors == ["dev@x", "new@x"]
+
+
+def test_failed_history_read_is_not_cached(tmp_path, monkeypatch):
+    repo = make_repo(tmp_path / "repo", [(_days_ago(2), "dev@x")])
+    cache_dir = tmp_path / "cache"
+    real_popen = subprocess.Popen
+
+    def dies_midway(args, *rest, **kwargs):
+        if args[:2] == ["git", "log"]:
+            args = ["sh", "-c", f"echo 'abc {_days_ago(1)}T10:00:00+00:00 a@x'; exit 1"]
+        return real_popen(args, *rest, **kwargs)
+
+    monkeypatch.setattr("subprocess.Popen", dies_midway)
+    collector = MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=str(cache_dir))
+    developers, commits = collector._get_history_days(repo)
+
+    # What was read is used, but the cut-short read is never cached
+    assert commits == {_days_ago(1): {"a@x": 1}}
+    assert collector._source_status["developers"]["status"] == PARTIAL
+    assert not os.path.exists(collector._developer_cache_file(repo))
+
+    monkeypatch.setattr("subprocess.Popen", real_popen)
+    fresh = MetricsCollector([repo], hook_log_path="/nonexistent/blocks.log", cache_dir=str(cache_dir))
+    assert fresh._get_history_days(repo)[1] == {_days_ago(2): {"dev@x": 1}}
+
+
+def test_hook_counts_come_from_the_exported_records(tmp_path, monkeypatch):
+    log = tmp_path / "blocks.log"
+    log.write_text("".join(
+        json.dumps({"ts": f"{_days_ago(d)}T10:00:00", "code": code, "user": "dev", "repo": "api"}) + "\n"
+        for d, code in ((1, "SECRET_BLOCKED"), (2, "PII_EXPOSED"), (400, "SECRET_BLOCKED"))
+    ))
+    expected = MetricsCollector([], hook_log_path=str(log), cache_dir=None)._parse_hook_logs()
+
+    def no_index_counts(*args, **kwargs):
+        raise AssertionError("counts must be tallied from the event stream")
+
+    monkeypatch.setattr(HookLogIndex, "counts", no_index_counts)
+    path = tmp_path / "events.ndjson"
+    with EventWriter(str(path)) as events:
+        counts = MetricsCollector([], hook_log_path=str(log), cache_dir=None, events=events)._parse_hook_logs()
+
+    assert counts == expected
+    assert (counts["secrets"], counts["pii"], counts["pii_exposed"]) == (1, 1, 1)
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_activity_percentiles_are_exact_over_all_active_developers():
+    partial = PartialMetrics(collected_at="t", period_start="s", period_end="e", is_baseline=False, months=1)
+    partial.active_developers = ExactCounter(f"dev{i}@x" for i in range(10))
+    partial.commit_activity = {f"dev{i}@x": (i + 1) * 4 for i in range(10)}
+    partial.commits = sum(partial.commit_activity.values())
+    # Two of the ten active developers merged PRs
+    partial.pr_activity = {"dev0": 8, "dev1": 40}
+    partial.prs_merged = 48
+
+    productivity = partial.finalize().productivity
+    # 4 weeks; commits per developer are 4, 8, ..., 40
+    assert productivity.commits_per_dev_per_week_p50 == 5.0
+    assert productivity.commits_per_dev_per_week_p90 == 9.0
+    assert productivity.commits_per_dev_per_week_p99 == 10.0
+    # Developers without PRs count as zeros, as they do in the mean
+    assert productivity.prs_per_dev_per_week == 1.2
+    assert productivity.prs_per_dev_per_week_p50 == 0.0
+    assert productivity.prs_per_dev_per_week_p90 == 2.0
+    assert productivity.prs_per_dev_per_week_p99 == 10.0
+
+
+def test_merge_rejects_mismatched_distinct_modes(repos, tmp_path, monkeypatch, capsys):
+    paths = []
+    for mode, error in (("exact", 0.01), ("hll", 0.01), ("hll", 0.05)):
+        collector = MetricsCollector(
+            repos[:1], hook_log_path="/nonexistent/blocks.log", distinct_mode=mode, hll_error=error, cache_dir=None
+        )
+        path = tmp_path / f"{mode}-{error}.json"
+        path.write_text(json.dumps(collector.collect_partial().to_dict()))
+        paths.append(str(path))
+
+    for first, second in ((0, 1), (1, 2)):
+        a, b = (PartialMetrics.from_dict(json.loads(open(paths[i]).read())) for i in (first, second))
+        with pytest.raises(ValueError, match="--distinct-mode or --hll-error"):
+            a.merge(b)
+
+    # The merge subcommand exits with the reason instead of a traceback
+    monkeypatch.setattr("sys.argv", ["collect_metrics.py", "merge", *paths[:2]])
+    with pytest.raises(SystemExit) as exit_info:
+        collect_metrics.main()
+    assert exit_info.value.code == 2
+    assert "exact vs hll" in capsys.readouterr().err
@@ -0,0 +1,157 @@
+import math
+
+import pytest
+
+from sketches import ExactCounter, HyperLogLog, KLLSketch, distinct_counter_from_dict
+
+
+def _hll(values, error=0.01):
+    sketch = HyperLogLog(error=error)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def _dense_registers(sketch: HyperLogLog) -> bytes:
+    copy = sketch.copy()
+    if copy.sparse is not None:
+        copy._densify()
+    return bytes(copy.registers)
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 20_000, 100_000])
+@pytest.mark.parametrize("error", [0.01, 0.05])
+def test_hll_error_within_bound(n, error):
+    sketch = _hll((f"dev{i}@example.com" for i in range(n)), error)
+    # 4 standard errors; deterministic hashing keeps this stable
+    assert abs(sketch.count() - n) <= max(1, 4 * error * n)
+
+
+def test_hll_sparse_and_dense_agree():
+    values = [f"user{i}" for i in range(5_000)]
+    sketch = HyperLogLog(error=0.01)
+    for i, value in enumerate(values):
+        sketch.add(value)
+        if i == 50:
+            assert sketch.sparse is not None
+    assert sketch.sparse is None
+
+    rebuilt = HyperLogLog(error=0.01)
+    for i in range(0, len(values), 10):
+        rebuilt.merge(_hll(values[i:i + 10]))
+    assert _dense_registers(rebuilt) == _dense_registers(sketch)
+    assert rebuilt.count() == sketch.count()
+
+
+def test_hll_merge_is_associative_and_commutative():
+    a = _hll(f"a{i}" for i in range(3_000))
+    b = _hll(f"b{i}" for i in range(20))
+    c = _hll(f"a{i}" for i in range(2_000, 9_000))
+
+    left = a.copy()
+    left.merge(b)
+    left.merge(c)
+
+    bc = b.copy()
+    bc.merge(c)
+    right = a.copy()
+    right.merge(bc)
+
+    reverse = c.copy()
+    reverse.merge(b)
+    reverse.merge(a)
+
+    assert _dense_registers(left) == _dense_registers(right) == _dense_registers(reverse)
+    assert abs(left.count() - 9_020) <= 4 * 0.01 * 9_020
+
+
+@pytest.mark.parametrize("n", [0, 5, 10_000])
+def test_hll_round_trip(n):
+    sketch = _hll(f"x{i}" for i in range(n))
+    restored = distinct_counter_from_dict(sketch.to_dict())
+    assert isinstance(restored, HyperLogLog)
+    assert _dense_registers(restored) == _dense_registers(sketch)
+    assert restored.count() == sketch.count()
+
+
+def test_hll_rejects_mismatched_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(error=0.01).merge(HyperLogLog(error=0.1))
+
+
+def test_exact_counter_merge_and_round_trip():
+    a = ExactCounter(["x", "y"])
+    a.merge(ExactCounter(["y", "z"]))
+    assert a.count() == 3
+    assert distinct_counter_from_dict(a.to_dict()).values == {"x", "y", "z"}
+
+
+def _kll(values, k=200):
+    sketch = KLLSketch(k)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def _max_rank_error(sketch: KLLSketch, n: int) -> float:
+    # Values are 0..n-1, so a value's rank is the value itself
+    return max(abs(sketch.quantile(q / 100) / n - q / 100) for q in range(1, 100))
+
+
+N_KLL = 100_000
+# A fixed permutation of 0..N_KLL-1, so arrival order is not sorted
+KLL_VALUES = [(i * 7919) % N_KLL for i in range(N_KLL)]
+
+
+def test_kll_small_inputs_are_exact():
+    sketch = _kll(range(1, 101))
+    assert sketch.quantile(0.5) == 50
+    assert sketch.quantile(0.9) == 90
+    assert sketch.quantile(1.0) == 100
+    assert KLLSketch().quantile(0.5) is None
+
+
+@pytest.mark.parametrize("k", [50, 200])
+def test_kll_rank_error_within_bound(k):
+    sketch = _kll(KLL_VALUES, k)
+    assert sketch.count() == N_KLL
+    # Documented rank error is about 1.7 / k; allow twice that
+    assert _max_rank_error(sketch, N_KLL) <= 2 * 1.7 / k
+    assert sum(len(items) for items in sketch.levels) < 4 * k
+
+
+@pytest.mark.parametrize("k", [50, 200])
+def test_kll_merge_is_associative_within_bound(k):
+    parts = [_kll(KLL_VALUES[i::3], k) for i in range(3)]
+
+    left = parts[0].copy()
+    left.merge(parts[1])
+    left.merge(parts[2])
+
+    right_tail = parts[1].copy()
+    right_tail.merge(parts[2])
+    right = parts[0].copy()
+    right.merge(right_tail)
+
+    swapped = parts[2].copy()
+    swapped.merge(parts[0])
+    swapped.merge(parts[1])
+
+    for merged in (left, right, swapped):
+        assert merged.count() == N_KLL
+        assert _max_rank_error(merged, N_KLL) <= 2 * 1.7 / k
+    # Different merge orders may keep different items, but agree within the bound
+    for q in (0.1, 0.5, 0.9, 0.99):
+        assert abs(left.quantile(q) - right.quantile(q)) / N_KLL <= 2 * 1.7 / k
+
+
+def test_kll_round_trip():
+    sketch = _kll(KLL_VALUES[:5000], k=50)
+    restored = KLLSketch.from_dict(sketch.to_dict())
+    assert restored.count() == sketch.count()
+    assert [restored.quantile(q / 10) for q in range(11)] == [sketch.quantile(q / 10) for q in range(11)]
+
+
+def test_kll_rejects_tiny_k():
+    with pytest.raises(ValueError):
+        KLLSketch(4)